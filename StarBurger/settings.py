@@ -13,6 +13,39 @@ env.read_env()
 SECRET_KEY = env.str("SECRET_KEY")
 
 YANDEX_KEY = env.str('YANDEX_KEY')
+GEOCODER_LRU_SIZE = env.int('GEOCODER_LRU_SIZE', default=1000)
+GEOCODER_STATS_FLUSH_INTERVAL = env.float('GEOCODER_STATS_FLUSH_INTERVAL', default=60)
+GEOCODER_NOT_FOUND_TTL = env.int('GEOCODER_NOT_FOUND_TTL', default=7 * 24 * 60 * 60)
+GEOCODER_FAILURE_TTL = env.int('GEOCODER_FAILURE_TTL', default=5 * 60)
+GEOCODING_MODE = env.str('GEOCODING_MODE', default='sync')
+GEOCODER_URL = env.str('GEOCODER_URL', default='https://geocode-maps.yandex.ru/1.x')
+GEOCODER_CONNECT_TIMEOUT = env.float('GEOCODER_CONNECT_TIMEOUT', default=3.05)
+GEOCODER_READ_TIMEOUT = env.float('GEOCODER_READ_TIMEOUT', default=5)
+GEOCODER_MAX_RETRIES = env.int('GEOCODER_MAX_RETRIES', default=2)
+GEOCODER_RETRY_BACKOFF = env.float('GEOCODER_RETRY_BACKOFF', default=0.5)
+GEOCODER_RATE_LIMIT = env.float('GEOCODER_RATE_LIMIT', default=10)
+GEOCODER_RATE_LIMIT_BURST = env.int('GEOCODER_RATE_LIMIT_BURST', default=10)
+GEOCODER_RATE_LIMIT_TIMEOUT = env.float('GEOCODER_RATE_LIMIT_TIMEOUT', default=5)
+GEOCODER_FAILURE_THRESHOLD = env.int('GEOCODER_FAILURE_THRESHOLD', default=5)
+GEOCODER_RECOVERY_TIMEOUT = env.float('GEOCODER_RECOVERY_TIMEOUT', default=30)
+GEOCODER_POOL_SIZE = env.int('GEOCODER_POOL_SIZE', default=10)
+
+DISTANCE_MODE = env.str('DISTANCE_MODE', default='haversine')
+RESTAURANTS_SEARCH_RADIUS_KM = env.float('RESTAURANTS_SEARCH_RADIUS_KM', default=50)
+NEAREST_RESTAURANTS_LIMIT = env.int('NEAREST_RESTAURANTS_LIMIT', default=10)
+
+ORDERS_BATCH_MAX_SIZE = env.int('ORDERS_BATCH_MAX_SIZE', default=500)
+ORDER_INTAKE_MODE = env.str('ORDER_INTAKE_MODE', default='sync')
+IDEMPOTENCY_KEY_TTL = env.int('IDEMPOTENCY_KEY_TTL', default=24 * 60 * 60)
+CATALOG_CACHE_TIMEOUT = env.int('CATALOG_CACHE_TIMEOUT', default=24 * 60 * 60)
+CATALOG_CACHE_MAX_SIZE = env.int('CATALOG_CACHE_MAX_SIZE', default=1024 * 1024)
+PRODUCTS_PAGE_SIZE = env.int('PRODUCTS_PAGE_SIZE', default=20)
+PRODUCTS_PAGE_MAX_SIZE = env.int('PRODUCTS_PAGE_MAX_SIZE', default=100)
+CATALOG_SNAPSHOTS_DIR = env.str('CATALOG_SNAPSHOTS_DIR', default='catalog')
+CATALOG_SNAPSHOTS_KEEP = env.int('CATALOG_SNAPSHOTS_KEEP', default=5)
+STOREFRONT_BOOTSTRAP = env.bool('STOREFRONT_BOOTSTRAP', default=False)
+BANNERS_CACHE_CHECK_INTERVAL = env.float('BANNERS_CACHE_CHECK_INTERVAL', default=5)
+PRODUCT_IMAGE_WIDTHS = env.list('PRODUCT_IMAGE_WIDTHS', subcast=int, default=[160, 320, 640])
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = env.bool('DEBUG', default=False)
@@ -22,6 +55,7 @@ ALLOWED_HOSTS = env.list("ALLOWED_HOSTS")
 INSTALLED_APPS = [
     'foodcartapp.apps.FoodcartappConfig',
     'restaurateur.apps.RestaurateurConfig',
+    'places.apps.PlacesConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'phonenumber_field',
@@ -90,6 +124,14 @@ DATABASES = {
     )
 }
 
+# Geocoder rate limit tokens are taken on a connection of their own, so the
+# bucket row isn't locked until a checkout transaction commits. SQLite locks
+# the whole file on write, a second connection would only wait for it there
+GEOCODER_RATE_LIMIT_DATABASE = 'default'
+if DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3':
+    GEOCODER_RATE_LIMIT_DATABASE = 'rate_limits'
+    DATABASES['rate_limits'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
 CACHES = {
    'default': {
       'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
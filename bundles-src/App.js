@@ -13,13 +13,23 @@ import NoResults from "./components/NoResults";
 
 import './css/App.css';
 
+// Catalog and banners inlined into the page by the server, if bootstrap mode is on
+function readInlineState(){
+  let stateElement = document.getElementById('bootstrap-state');
+  if (!stateElement){
+    return null;
+  }
+  return JSON.parse(stateElement.textContent);
+}
+
 class App extends Component {
 
   constructor(props){
     super();
+    const inlineState = readInlineState();
     this.state = {
-      banners: [],  // null represent "Loading" state, will be replaced by Array on server response
-      products: null,  // null represent "Loading" state, will be replaced by Array on server response
+      banners: inlineState ? inlineState.banners : [],  // null represent "Loading" state, will be replaced by Array on server response
+      products: inlineState ? inlineState.products : null,  // null represent "Loading" state, will be replaced by Array on server response
       term: '',
       cart: [],
       quickViewProduct: null,  // will be replaced by selected product attributes
@@ -101,8 +111,8 @@ class App extends Component {
   }
 
 
-  async getProducts(){
-    let response = await fetch('/api/products/', {
+  async getInitialState(){
+    let response = await fetch('/api/bootstrap/', {
       headers: {
         'Accept': 'application/json',
         'Content-Type': 'application/json',
@@ -115,31 +125,15 @@ class App extends Component {
 
     let data = await response.json();
     this.setState({
-      products : data
-    });
-  }
-
-  async getBanners(){
-    let response = await fetch('/api/banners/', {
-      headers: {
-        'Accept': 'application/json',
-        'Content-Type': 'application/json',
-      }
-    });
-
-    if (!response.ok){
-      return;
-    }
-
-    let data = await response.json();
-    this.setState({
-      banners : data
+      products : data.products,
+      banners : data.banners,
     });
   }
 
   componentDidMount(){
-    this.getProducts();
-    this.getBanners();
+    if (!this.state.products){
+      this.getInitialState();
+    }
   }
 
 
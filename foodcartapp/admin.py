@@ -8,8 +8,11 @@ from .models import Product
 from .models import ProductCategory
 from .models import Restaurant
 from .models import RestaurantMenuItem
-from .models import OrderProduct, Order
+from .models import OrderProduct, Order, OrderIntake
+from .models import Banner
 from django.forms import ModelForm
+from django.db.models import Q
+from .spatial_index import find_nearest_restaurants
 
 
 class RestaurantMenuItemInline(admin.TabularInline):
@@ -28,6 +31,13 @@ class OrderAdminForm(ModelForm):
 
         if self.instance:
             choices = self.instance.order_restaurants
+            if self.instance.lat and self.instance.lon:
+                nearest_restaurants = find_nearest_restaurants(
+                    self.instance.lat, self.instance.lon,
+                    restaurant_ids=set(choices.values_list('id', flat=True)))
+                choices = choices.filter(
+                    Q(id__in=[restaurant_id for restaurant_id, _ in nearest_restaurants])
+                    | Q(id=self.instance.restaurant_id))
             self.fields['restaurant'].queryset = choices
 
 
@@ -127,17 +137,84 @@ class ProductAdmin(admin.ModelAdmin):
     def get_image_preview(self, obj):
         if not obj.image:
             return 'выберите картинку'
-        return format_html('<img src="{url}" height="200"/>', url=obj.image.url)
+        return format_html('<img src="{url}" height="200"/>', url=obj.get_image_variant_url(640))
     get_image_preview.short_description = 'превью'
 
     def get_image_list_preview(self, obj):
         if not obj.image or not obj.id:
             return 'нет картинки'
         edit_url = reverse('admin:foodcartapp_product_change', args=(obj.id,))
-        return format_html('<a href="{edit_url}"><img src="{src}" height="50"/></a>', edit_url=edit_url, src=obj.image.url)
+        return format_html(
+            '<a href="{edit_url}"><img src="{src}" height="50"/></a>',
+            edit_url=edit_url, src=obj.image_thumbnail_url,
+        )
     get_image_list_preview.short_description = 'превью'
 
 
 @admin.register(ProductCategory)
 class ProductAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(OrderIntake)
+class OrderIntakeAdmin(admin.ModelAdmin):
+    list_display = [
+        'id',
+        'status',
+        'created_at',
+        'processed_at',
+        'order',
+    ]
+    list_filter = [
+        'status',
+    ]
+    raw_id_fields = [
+        'order',
+    ]
+
+
+@admin.register(Banner)
+class BannerAdmin(admin.ModelAdmin):
+    list_display = [
+        'get_image_list_preview',
+        'title',
+        'order',
+        'is_published',
+        'active_from',
+        'active_until',
+    ]
+    list_display_links = [
+        'title',
+    ]
+    list_editable = [
+        'order',
+        'is_published',
+    ]
+    list_filter = [
+        'is_published',
+    ]
+    fields = [
+        'title',
+        'text',
+        'image',
+        'get_image_preview',
+        'order',
+        'is_published',
+        'active_from',
+        'active_until',
+    ]
+    readonly_fields = [
+        'get_image_preview',
+    ]
+
+    def get_image_preview(self, obj):
+        if not obj.image:
+            return 'выберите картинку'
+        return format_html('<img src="{url}" height="200"/>', url=obj.image.url)
+    get_image_preview.short_description = 'превью'
+
+    def get_image_list_preview(self, obj):
+        if not obj.image:
+            return 'нет картинки'
+        return format_html('<img src="{src}" height="50"/>', src=obj.image.url)
+    get_image_list_preview.short_description = 'превью'
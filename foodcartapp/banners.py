@@ -0,0 +1,120 @@
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+
+BANNERS_VERSION_CACHE_KEY = 'banners_version'
+
+ActiveBanners = namedtuple('ActiveBanners', ['banners', 'json', 'etag'])
+
+
+def get_banners_version():
+    version = cache.get(BANNERS_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(BANNERS_VERSION_CACHE_KEY, uuid4().hex, None)
+        version = cache.get(BANNERS_VERSION_CACHE_KEY)
+    return version
+
+
+def invalidate_banners():
+    cache.set(BANNERS_VERSION_CACHE_KEY, uuid4().hex, None)
+    banners_cache.reset()
+
+
+def load_banners():
+    from .models import Banner
+
+    banners = Banner.objects.published().filter(
+        Q(active_until__isnull=True) | Q(active_until__gt=timezone.now())
+    )
+    return [
+        {
+            'title': banner.title,
+            'src': banner.image.url,
+            'text': banner.text,
+            'active_from': banner.active_from,
+            'active_until': banner.active_until,
+        }
+        for banner in banners
+    ]
+
+
+def get_shared_banners(version):
+    cache_key = f'banners:{version}'
+    banners = cache.get(cache_key)
+    if banners is None:
+        banners = load_banners()
+        cache.set(cache_key, banners, settings.CATALOG_CACHE_TIMEOUT)
+    return banners
+
+
+def select_active_banners(banners, now):
+    """Return banners shown at the moment and the moment when this selection changes."""
+    active_banners = [
+        banner for banner in banners
+        if (banner['active_from'] is None or banner['active_from'] <= now)
+        and (banner['active_until'] is None or now < banner['active_until'])
+    ]
+    boundaries = [
+        moment
+        for banner in banners for moment in [banner['active_from'], banner['active_until']]
+        if moment and moment > now
+    ]
+    return active_banners, min(boundaries, default=None)
+
+
+class BannersCache:
+    """Active banners kept in-process until the shared version changes or a banner window opens or closes."""
+
+    def __init__(self, check_interval):
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.version = None
+        self.banners = None
+        self.active_banners = None
+        self.expires_at = None
+        self.checked_at = None
+
+    def get(self):
+        with self.lock:
+            checked_at = time.monotonic()
+            if self.checked_at is None or checked_at - self.checked_at >= self.check_interval:
+                version = get_banners_version()
+                if version != self.version:
+                    self.banners = get_shared_banners(version)
+                    self.version = version
+                    self.active_banners = None
+                self.checked_at = checked_at
+
+            now = timezone.now()
+            if self.active_banners is None or (self.expires_at and now >= self.expires_at):
+                active_banners, self.expires_at = select_active_banners(self.banners, now)
+                dumped_banners = [
+                    {'title': banner['title'], 'src': banner['src'], 'text': banner['text']}
+                    for banner in active_banners
+                ]
+                dumped_json = json.dumps(dumped_banners, ensure_ascii=False, separators=(',', ':'))
+                self.active_banners = ActiveBanners(
+                    banners=dumped_banners,
+                    json=dumped_json,
+                    etag=hashlib.md5(dumped_json.encode()).hexdigest()[:12],
+                )
+            return self.active_banners
+
+
+banners_cache = BannersCache(settings.BANNERS_CACHE_CHECK_INTERVAL)
+
+
+def get_active_banners():
+    return banners_cache.get()
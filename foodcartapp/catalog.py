@@ -0,0 +1,241 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.urls import reverse
+
+from .banners import get_active_banners
+from .images import get_image_srcset
+
+
+CATALOG_VERSION_CACHE_KEY = 'catalog_version'
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_CACHE_KEY, uuid4().hex, None)
+        version = cache.get(CATALOG_VERSION_CACHE_KEY)
+    return version
+
+
+def invalidate_catalog():
+    cache.set(CATALOG_VERSION_CACHE_KEY, uuid4().hex, None)
+
+
+def schedule_catalog_invalidation():
+    """Bump the catalog version once per transaction, however many catalog rows it has changed."""
+    connection = transaction.get_connection()
+    if connection.in_atomic_block and any(func is invalidate_catalog for _, func in connection.run_on_commit):
+        return
+    transaction.on_commit(invalidate_catalog)
+
+
+def dump_json(data, pretty=False):
+    if pretty:
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, indent=4)
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+
+
+PRODUCT_FIELDS_COLUMNS = {
+    'id': ['id'],
+    'name': ['name'],
+    'price': ['price'],
+    'special_status': ['special_status'],
+    'description': ['description'],
+    'category': ['category_id', 'category__name'],
+    'image': ['image'],
+    'image_srcset': ['image_variants'],
+    'restaurant': ['id', 'name'],
+}
+
+CatalogQuery = namedtuple('CatalogQuery', ['category', 'special_status', 'fields', 'cursor', 'limit'])
+ALL_PRODUCTS = CatalogQuery(category=None, special_status=None, fields=None, cursor=None, limit=None)
+
+
+def encode_cursor(product_id):
+    return urlsafe_b64encode(str(product_id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        return int(urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Некорректный параметр cursor.')
+
+
+def parse_int_param(params, name):
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'Параметр {name} должен быть целым числом.')
+
+
+def parse_catalog_query(params):
+    special_status = params.get('special_status')
+    if special_status not in (None, '0', '1', 'true', 'false'):
+        raise ValueError('Параметр special_status должен быть 1 или 0.')
+
+    fields = None
+    if params.get('fields'):
+        fields = params['fields'].split(',')
+        unknown_fields = [field for field in fields if field not in PRODUCT_FIELDS_COLUMNS]
+        if unknown_fields:
+            raise ValueError(f'Неизвестные поля: {", ".join(unknown_fields)}.')
+        fields = [field for field in PRODUCT_FIELDS_COLUMNS if field in fields]
+
+    limit = parse_int_param(params, 'limit')
+    cursor = params.get('cursor')
+    if limit is None and cursor is not None:
+        limit = settings.PRODUCTS_PAGE_SIZE
+    if limit is not None and not 1 <= limit <= settings.PRODUCTS_PAGE_MAX_SIZE:
+        raise ValueError(f'Параметр limit должен быть от 1 до {settings.PRODUCTS_PAGE_MAX_SIZE}.')
+
+    return CatalogQuery(
+        category=parse_int_param(params, 'category'),
+        special_status=None if special_status is None else special_status in ('1', 'true'),
+        fields=fields,
+        cursor=decode_cursor(cursor) if cursor else None,
+        limit=limit,
+    )
+
+
+def get_query_params(query):
+    params = {
+        'category': query.category,
+        'special_status': None if query.special_status is None else int(query.special_status),
+        'fields': query.fields and ','.join(query.fields),
+        'limit': query.limit,
+        'cursor': query.cursor and encode_cursor(query.cursor),
+    }
+    return urlencode({name: value for name, value in params.items() if value is not None})
+
+
+def filter_products(query):
+    from .models import Product
+
+    products = Product.objects.available().order_by('id')
+    if query.category is not None:
+        products = products.filter(category=query.category)
+    if query.special_status is not None:
+        products = products.filter(special_status=query.special_status)
+    if query.cursor is not None:
+        products = products.filter(id__gt=query.cursor)
+    return products
+
+
+def dump_product_field(field, product, image_storage):
+    if field == 'category':
+        if not product['category_id']:
+            return None
+        return {'id': product['category_id'], 'name': product['category__name']}
+    if field == 'image':
+        return image_storage.url(product['image'])
+    if field == 'image_srcset':
+        return get_image_srcset(product['image_variants'], image_storage)
+    if field == 'restaurant':
+        return {'id': product['id'], 'name': product['name']}
+    return product[field]
+
+
+def iter_products(products, fields=None):
+    """Yield (id, dumped product) pairs read straight from the database rows."""
+    from .models import Product
+
+    image_storage = Product._meta.get_field('image').storage
+    fields = fields or list(PRODUCT_FIELDS_COLUMNS)
+    columns = {'id', *(column for field in fields for column in PRODUCT_FIELDS_COLUMNS[field])}
+    for product in products.values(*columns).iterator():
+        yield product['id'], {field: dump_product_field(field, product, image_storage) for field in fields}
+
+
+def dump_products_page(query, pretty=False):
+    products = list(iter_products(filter_products(query)[:query.limit + 1], query.fields))
+    next_url = None
+    if len(products) > query.limit:
+        products = products[:query.limit]
+        last_product_id, _ = products[-1]
+        next_url = f'{reverse("foodcartapp:products")}?{get_query_params(query._replace(cursor=last_product_id))}'
+    return dump_json({
+        'results': [dumped_product for _, dumped_product in products],
+        'next': next_url,
+    }, pretty)
+
+
+def iter_json_list(items, pretty=False):
+    separator = '[\n    ' if pretty else '['
+    for item in items:
+        dumped_item = dump_json(item, pretty)
+        yield separator + (dumped_item.replace('\n', '\n    ') if pretty else dumped_item)
+        separator = ',\n    ' if pretty else ','
+    if separator.startswith('['):
+        yield '[]'
+    else:
+        yield '\n]' if pretty else ']'
+
+
+def get_catalog_cache_key(version, query, pretty=False):
+    return f'catalog:{version}:{"pretty" if pretty else "compact"}:{get_query_params(query)}'
+
+
+def get_cached_catalog_json(version, query=ALL_PRODUCTS, pretty=False):
+    return cache.get(get_catalog_cache_key(version, query, pretty))
+
+
+def iter_catalog_json(version, query=ALL_PRODUCTS, pretty=False):
+    """Render the catalog chunk by chunk, cache it if it turns out to be small enough."""
+    if query.limit:
+        chunks = [dump_products_page(query, pretty)]
+    else:
+        chunks = iter_json_list(
+            (dumped_product for _, dumped_product in iter_products(filter_products(query), query.fields)),
+            pretty,
+        )
+
+    cached_chunks = []
+    size = 0
+    for chunk in chunks:
+        if cached_chunks is not None:
+            size += len(chunk)
+            cached_chunks.append(chunk)
+            if size > settings.CATALOG_CACHE_MAX_SIZE:
+                cached_chunks = None
+        yield chunk
+    if cached_chunks is not None:
+        cache.set(
+            get_catalog_cache_key(version, query, pretty), ''.join(cached_chunks), settings.CATALOG_CACHE_TIMEOUT
+        )
+
+
+def get_catalog_json(version=None, query=ALL_PRODUCTS, pretty=False):
+    version = version or get_catalog_version()
+    catalog_json = get_cached_catalog_json(version, query, pretty)
+    if catalog_json is None:
+        catalog_json = ''.join(iter_catalog_json(version, query, pretty))
+    return catalog_json
+
+
+SCRIPT_JSON_ESCAPES = {ord('<'): '\\u003C', ord('>'): '\\u003E', ord('&'): '\\u0026'}
+
+
+def get_bootstrap_json(version=None, active_banners=None):
+    """Catalog and banners in one JSON document, safe to inline into a <script> tag."""
+    version = version or get_catalog_version()
+    active_banners = active_banners or get_active_banners()
+    cache_key = f'catalog:{version}:bootstrap_products'
+    products_json = cache.get(cache_key)
+    if products_json is None:
+        products_json = get_catalog_json(version).translate(SCRIPT_JSON_ESCAPES)
+        if len(products_json) <= settings.CATALOG_CACHE_MAX_SIZE:
+            cache.set(cache_key, products_json, settings.CATALOG_CACHE_TIMEOUT)
+    banners_json = active_banners.json.translate(SCRIPT_JSON_ESCAPES)
+    return f'{{"products":{products_json},"banners":{banners_json}}}'
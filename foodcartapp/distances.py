@@ -0,0 +1,42 @@
+import numpy as np
+from django.conf import settings
+from geopy import distance
+
+EARTH_RADIUS_KM = distance.EARTH_RADIUS
+
+
+def calculate_haversine_distances(origins, destinations):
+    origins = np.radians(np.asarray(origins, dtype=float).reshape(-1, 2))
+    destinations = np.radians(np.asarray(destinations, dtype=float).reshape(-1, 2))
+    origins_lat, origins_lon = origins[:, 0], origins[:, 1]
+    destinations_lat, destinations_lon = destinations[:, 0], destinations[:, 1]
+
+    haversine = (
+        np.sin((destinations_lat - origins_lat) / 2) ** 2
+        + np.cos(origins_lat) * np.cos(destinations_lat)
+        * np.sin((destinations_lon - origins_lon) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(haversine, 0, 1)))
+
+
+def calculate_geodesic_distances(origins, destinations):
+    return np.array([
+        distance.distance(origin, destination).km
+        for origin, destination in zip(origins, destinations)
+    ], dtype=float)
+
+
+DISTANCE_CALCULATORS = {
+    'haversine': calculate_haversine_distances,
+    'geodesic': calculate_geodesic_distances,
+}
+
+
+def calculate_distances(origins, destinations, mode=None):
+    """Return distances in km between paired (lat, lon) points.
+
+    `haversine` treats the Earth as a sphere and is vectorized with NumPy,
+    `geodesic` calls geopy for every pair and is exact on the WGS-84 ellipsoid.
+    """
+    calculator = DISTANCE_CALCULATORS[mode or settings.DISTANCE_MODE]
+    return calculator(origins, destinations)
@@ -0,0 +1,96 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+
+
+def get_request_hash(request):
+    dumped_request = json.dumps(
+        [request.method, request.path, request.data], cls=JSONEncoder, sort_keys=True
+    )
+    return hashlib.sha256(dumped_request.encode()).hexdigest()
+
+
+def replay_response(idempotency_key, request_hash):
+    if idempotency_key and idempotency_key.request_hash != request_hash:
+        return Response(
+            {'detail': f'Ключ {IDEMPOTENCY_KEY_HEADER} уже использован для другого запроса.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if not idempotency_key or idempotency_key.status_code is None:
+        return Response(
+            {'detail': 'Запрос с этим ключом ещё обрабатывается.'},
+            status=status.HTTP_409_CONFLICT,
+        )
+    headers = json.loads(idempotency_key.headers or '{}')
+    headers['Idempotent-Replayed'] = 'true'
+    return Response(
+        json.loads(idempotency_key.response), status=idempotency_key.status_code, headers=headers
+    )
+
+
+def find_idempotency_key(key):
+    idempotency_key = IdempotencyKey.objects.filter(key=key).first()
+    if idempotency_key and idempotency_key.expires_at <= timezone.now():
+        idempotency_key.delete()
+        return None
+    return idempotency_key
+
+
+def reserve_idempotency_key(key, request_hash):
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                key=key,
+                request_hash=request_hash,
+                expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+    except IntegrityError:
+        return None
+
+
+def idempotent(view):
+    """Replay the stored response to requests repeated with the same Idempotency-Key header."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return Response(
+                {'detail': f'Заголовок {IDEMPOTENCY_KEY_HEADER} слишком длинный.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        request_hash = get_request_hash(request)
+        idempotency_key = find_idempotency_key(key)
+        if idempotency_key:
+            return replay_response(idempotency_key, request_hash)
+
+        with transaction.atomic():
+            idempotency_key = reserve_idempotency_key(key, request_hash)
+            if idempotency_key:
+                response = view(request, *args, **kwargs)
+                idempotency_key.status_code = response.status_code
+                idempotency_key.headers = json.dumps(dict(response.items()))
+                idempotency_key.response = json.dumps(response.data, cls=JSONEncoder, ensure_ascii=False)
+                idempotency_key.save(update_fields=['status_code', 'headers', 'response'])
+        if not idempotency_key:
+            # A concurrent request with the same key has won the race
+            return replay_response(find_idempotency_key(key), request_hash)
+        return response
+
+    return wrapper
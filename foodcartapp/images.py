@@ -0,0 +1,83 @@
+"""Resized copies of product images, named by content hash and stored next to the originals."""
+import hashlib
+import io
+import json
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, features
+
+
+IMAGE_VARIANT_FORMATS = {
+    'jpeg': {'format': 'JPEG', 'extension': 'jpg', 'options': {'quality': 85, 'optimize': True, 'progressive': True}},
+    'webp': {'format': 'WEBP', 'extension': 'webp', 'options': {'quality': 80, 'method': 6}},
+}
+
+
+def get_variant_formats():
+    return [
+        variant_format for variant_format in IMAGE_VARIANT_FORMATS
+        if variant_format != 'webp' or features.check('webp')
+    ]
+
+
+def render_variants(image_file, widths):
+    """Yield (width, format, content) for every width not larger than the original one."""
+    with Image.open(image_file) as image:
+        image.load()
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        widths = sorted({min(width, image.width) for width in widths})
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized_image = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for variant_format in get_variant_formats():
+                params = IMAGE_VARIANT_FORMATS[variant_format]
+                content = io.BytesIO()
+                resized_image.save(content, params['format'], **params['options'])
+                yield width, variant_format, content.getvalue()
+
+
+def generate_image_variants(image_name, storage=default_storage):
+    """Store resized copies of the image, return them as a JSON map for Product.image_variants."""
+    stem, _ = os.path.splitext(image_name)
+    variants = []
+    with storage.open(image_name) as image_file:
+        for width, variant_format, content in render_variants(image_file, settings.PRODUCT_IMAGE_WIDTHS):
+            content_hash = hashlib.sha256(content).hexdigest()[:12]
+            extension = IMAGE_VARIANT_FORMATS[variant_format]['extension']
+            variant_name = f'{stem}.{width}w.{content_hash}.{extension}'
+            if not storage.exists(variant_name):
+                variant_name = storage.save(variant_name, ContentFile(content))
+            variants.append({'width': width, 'format': variant_format, 'name': variant_name})
+    return json.dumps({'source': image_name, 'variants': variants})
+
+
+def load_image_variants(image_variants):
+    if not image_variants:
+        return None, []
+    image_variants = json.loads(image_variants)
+    return image_variants['source'], image_variants['variants']
+
+
+def get_image_srcset(image_variants, storage=default_storage):
+    _, variants = load_image_variants(image_variants)
+    srcset = {}
+    for variant in variants:
+        srcset.setdefault(variant['format'], []).append(f'{storage.url(variant["name"])} {variant["width"]}w')
+    return {variant_format: ', '.join(sources) for variant_format, sources in srcset.items()}
+
+
+def get_image_variant_url(image, image_variants, width, storage=default_storage):
+    """URL of the narrowest JPEG copy at least as wide as requested, or of the original image."""
+    source, variants = load_image_variants(image_variants)
+    if source == image.name:
+        suitable_variants = [
+            variant for variant in variants
+            if variant['format'] == 'jpeg' and variant['width'] >= width
+        ]
+        if suitable_variants:
+            return storage.url(min(suitable_variants, key=lambda variant: variant['width'])['name'])
+    return image.url
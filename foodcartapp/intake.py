@@ -0,0 +1,51 @@
+import json
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OrderIntake
+from .serializers import register_orders
+
+
+def enqueue_order(order_fields):
+    return OrderIntake.objects.create(payload=json.dumps(order_fields, ensure_ascii=False))
+
+
+def register_intake(intake):
+    try:
+        with transaction.atomic():
+            return register_orders([json.loads(intake.payload)])[0]
+    except Exception as error:
+        return {'errors': {'non_field_errors': [f'Не удалось зарегистрировать заказ: {error}']}}
+
+
+def register_intakes(intakes):
+    # Register the whole batch at once and fall back to one savepoint per
+    # intake, so a broken payload is rejected instead of blocking the queue
+    try:
+        with transaction.atomic():
+            return register_orders([json.loads(intake.payload) for intake in intakes])
+    except Exception:
+        return [register_intake(intake) for intake in intakes]
+
+
+def process_order_intakes(batch_size):
+    with transaction.atomic():
+        intakes = OrderIntake.objects.select_for_update(skip_locked=True)\
+            .filter(status=OrderIntake.Status.queued).order_by('created_at')[:batch_size]
+        intakes = list(intakes)
+        if not intakes:
+            return 0
+
+        results = register_intakes(intakes)
+        processed_at = timezone.now()
+        for intake, result in zip(intakes, results):
+            intake.processed_at = processed_at
+            if 'order' in result:
+                intake.status = OrderIntake.Status.registered
+                intake.order_id = result['order']['id']
+            else:
+                intake.status = OrderIntake.Status.rejected
+                intake.errors = json.dumps(result['errors'], ensure_ascii=False)
+        OrderIntake.objects.bulk_update(intakes, ['status', 'processed_at', 'order', 'errors'])
+    return len(intakes)
@@ -0,0 +1,76 @@
+import random
+from collections import defaultdict
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand, CommandError
+
+from foodcartapp.matching import match_orders
+
+
+def match_orders_by_sets(orders_with_products, menu_items):
+    restaurants_with_products = defaultdict(list)
+    for restaurant, product in menu_items:
+        restaurants_with_products[restaurant].append(product)
+
+    orders_restaurants = {}
+    for order, products_set in orders_with_products.items():
+        restaurants = []
+        for restaurant, products in restaurants_with_products.items():
+            if {*products_set}.issubset({*products}):
+                restaurants.append(restaurant)
+        orders_restaurants[order] = restaurants
+    return orders_restaurants
+
+
+def generate_menu(restaurants_count, products_count, availability):
+    return [
+        (restaurant, product)
+        for restaurant in range(restaurants_count)
+        for product in range(products_count)
+        if random.random() < availability
+    ]
+
+
+def generate_orders(orders_count, products_count, max_order_size):
+    return {
+        order: random.sample(range(products_count), random.randint(1, max_order_size))
+        for order in range(orders_count)
+    }
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает скорость подбора ресторанов для заказов: битовые маски против множеств'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, nargs='+', default=[100, 300, 1000])
+        parser.add_argument('--restaurants', type=int, default=100)
+        parser.add_argument('--products', type=int, default=50)
+        parser.add_argument('--max-order-size', type=int, default=5)
+        parser.add_argument('--availability', type=float, default=0.9)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        menu_items = generate_menu(options['restaurants'], options['products'], options['availability'])
+        self.stdout.write(
+            f"{options['restaurants']} ресторанов, {options['products']} товаров, "
+            f"{len(menu_items)} пунктов меню"
+        )
+        self.stdout.write(f"{'заказов':>8} {'множества, с':>14} {'маски, с':>10} {'ускорение':>10}")
+        for orders_count in options['orders']:
+            orders = generate_orders(orders_count, options['products'], options['max_order_size'])
+
+            started_at = default_timer()
+            expected = match_orders_by_sets(orders, menu_items)
+            sets_elapsed = default_timer() - started_at
+
+            started_at = default_timer()
+            matched = match_orders(orders, menu_items)
+            masks_elapsed = default_timer() - started_at
+
+            if matched != expected:
+                raise CommandError('Результаты подбора ресторанов не совпадают')
+            self.stdout.write(
+                f'{orders_count:>8} {sets_elapsed:>14.4f} {masks_elapsed:>10.4f} '
+                f'{sets_elapsed / masks_elapsed:>9.0f}x'
+            )
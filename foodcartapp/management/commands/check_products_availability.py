@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from foodcartapp.catalog import invalidate_catalog
+from foodcartapp.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики ресторанов, где товар в продаже, с меню ресторанов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Пересчитать расходящиеся счётчики')
+
+    def handle(self, *args, **options):
+        drifted_products = Product.objects.with_actual_restaurants_count()\
+            .exclude(available_restaurants_count=F('actual_restaurants_count'))\
+            .values_list('id', 'name', 'available_restaurants_count', 'actual_restaurants_count')
+        drifted_products = list(drifted_products)
+        if not drifted_products:
+            self.stdout.write('Расхождений нет')
+            return
+
+        for product_id, name, stored_count, actual_count in drifted_products:
+            self.stdout.write(f'{name} (id {product_id}): записано {stored_count}, на самом деле {actual_count}')
+        if not options['fix']:
+            raise CommandError(f'Расходятся счётчики у {len(drifted_products)} товаров')
+
+        Product.objects.filter(id__in=[product_id for product_id, *_ in drifted_products])\
+            .recount_available_restaurants()
+        invalidate_catalog()
+        self.stdout.write(f'Пересчитано товаров: {len(drifted_products)}')
@@ -0,0 +1,55 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from foodcartapp.catalog import invalidate_catalog
+from foodcartapp.images import generate_image_variants, load_image_variants
+from foodcartapp.models import Product
+
+
+def generate_product_image_variants(product_fields):
+    product_id, image_name = product_fields
+    try:
+        return product_id, generate_image_variants(image_name), None
+    except OSError as error:
+        return product_id, None, f'{image_name}: {error}'
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии картинок товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Число процессов, по умолчанию по числу ядер')
+        parser.add_argument('--force', action='store_true', help='Пересоздать копии у всех товаров')
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        products = [
+            (product_id, image_name)
+            for product_id, image_name, image_variants in Product.objects.exclude(image='')
+            .values_list('id', 'image', 'image_variants')
+            if options['force'] or load_image_variants(image_variants)[0] != image_name
+        ]
+        if not products:
+            self.stdout.write('Все картинки уже обработаны')
+            return
+
+        # Worker processes must not inherit the parent's database connection
+        connection.close()
+        updated_products = []
+        failures = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            results = executor.map(generate_product_image_variants, products, chunksize=8)
+            for product_id, image_variants, error in results:
+                if error:
+                    failures += 1
+                    self.stderr.write(error)
+                    continue
+                updated_products.append(Product(id=product_id, image_variants=image_variants))
+                if len(updated_products) >= options['batch_size']:
+                    Product.objects.bulk_update(updated_products, ['image_variants'])
+                    updated_products = []
+        Product.objects.bulk_update(updated_products, ['image_variants'])
+        invalidate_catalog()
+        self.stdout.write(f'Обработано картинок: {len(products) - failures}, с ошибками: {failures}')
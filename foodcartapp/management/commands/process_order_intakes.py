@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.intake import process_order_intakes
+
+
+class Command(BaseCommand):
+    help = 'Оформляет заказы из очереди заявок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--poll-interval', type=float, default=1, help='Пауза в секундах, когда очередь пуста')
+        parser.add_argument('--once', action='store_true', help='Разобрать очередь и завершиться')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_order_intakes(options['batch_size'])
+            if processed:
+                self.stdout.write(f'Обработано заявок: {processed}')
+                continue
+            if options['once']:
+                return
+            time.sleep(options['poll_interval'])
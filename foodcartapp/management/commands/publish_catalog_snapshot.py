@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.snapshots import is_snapshot_stale, publish_catalog_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Сохраняет каталог и баннеры в статические файлы для раздачи веб-сервером'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watch', action='store_true',
+            help='Не завершаться, а пересобирать снимок, когда каталог или баннеры изменились',
+        )
+        parser.add_argument('--poll-interval', type=float, default=5, help='Пауза в секундах между проверками')
+
+    def handle(self, *args, **options):
+        while True:
+            if not options['watch'] or is_snapshot_stale():
+                pointer = publish_catalog_snapshot()
+                self.stdout.write(f'Товары: {pointer["products"]}')
+                self.stdout.write(f'Баннеры: {pointer["banners"]}')
+            if not options['watch']:
+                return
+            time.sleep(options['poll_interval'])
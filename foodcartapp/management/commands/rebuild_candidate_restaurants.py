@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from foodcartapp.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рестораны, способные приготовить необработанные заказы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только сравнить сохранённые рестораны с рассчитанными, ничего не меняя',
+        )
+
+    def handle(self, *args, **options):
+        orders = Order.objects.open()
+        if not options['check']:
+            orders.refresh_candidate_restaurants()
+            self.stdout.write(f'Пересчитано заказов: {orders.count()}')
+            return
+
+        expected = orders.find_candidate_restaurants()
+        stored = {order_id: set() for order_id in expected}
+        OrderCandidate = Order.candidate_restaurants.through
+        candidates = OrderCandidate.objects.filter(order__in=expected)\
+            .values_list('order', 'restaurant')
+        for order_id, restaurant_id in candidates:
+            stored[order_id].add(restaurant_id)
+
+        drifted_orders = [
+            order_id for order_id, restaurant_ids in expected.items()
+            if set(restaurant_ids) != stored[order_id]
+        ]
+        if drifted_orders:
+            raise CommandError(
+                f'Рестораны устарели у {len(drifted_orders)} из {len(expected)} заказов: '
+                f'{", ".join(map(str, drifted_orders))}'
+            )
+        self.stdout.write(f'Расхождений нет, проверено заказов: {len(expected)}')
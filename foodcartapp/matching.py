@@ -0,0 +1,46 @@
+"""Match orders with restaurants that can cook all of their products.
+
+The availability menu is encoded as a product x restaurant boolean matrix:
+every product maps to an int whose i-th bit is set when the i-th restaurant
+has it on sale. Restaurants able to cook an order are the bitwise AND of
+its products' masks, so matching costs O(order size), not O(menu size).
+"""
+
+
+def build_menu_matrix(menu_items):
+    restaurants = []
+    restaurant_bits = {}
+    product_masks = {}
+    for restaurant, product in menu_items:
+        if restaurant not in restaurant_bits:
+            restaurant_bits[restaurant] = 1 << len(restaurants)
+            restaurants.append(restaurant)
+        product_masks[product] = product_masks.get(product, 0) | restaurant_bits[restaurant]
+    return restaurants, product_masks
+
+
+def decode_mask(mask, restaurants):
+    matched = []
+    while mask:
+        lowest_bit = mask & -mask
+        matched.append(restaurants[lowest_bit.bit_length() - 1])
+        mask ^= lowest_bit
+    return matched
+
+
+def match_orders(orders_with_products, menu_items):
+    restaurants, product_masks = build_menu_matrix(menu_items)
+    all_restaurants_mask = (1 << len(restaurants)) - 1
+
+    matched_by_mask = {}
+    orders_restaurants = {}
+    for order, products in orders_with_products.items():
+        mask = all_restaurants_mask
+        for product in products:
+            mask &= product_masks.get(product, 0)
+            if not mask:
+                break
+        if mask not in matched_by_mask:
+            matched_by_mask[mask] = decode_mask(mask, restaurants)
+        orders_restaurants[order] = list(matched_by_mask[mask])
+    return orders_restaurants
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.7 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0056_auto_20210129_1225'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='candidate_restaurants',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='candidate_orders', to='foodcartapp.Restaurant', verbose_name='Рестораны, способные приготовить заказ'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.0.7 on 2026-10-18 20:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0057_order_candidate_restaurants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderIntake',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('payload', models.TextField(verbose_name='Данные заказа в JSON')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('registered', 'Оформлен'), ('rejected', 'Отклонён')], default='queued', max_length=10, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Принят в очередь')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Обработан')),
+                ('errors', models.TextField(blank=True, verbose_name='Ошибки проверки в JSON')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='intakes', to='foodcartapp.Order', verbose_name='Заказ')),
+            ],
+            options={
+                'verbose_name': 'Заявка на заказ',
+                'verbose_name_plural': 'Очередь заявок на заказ',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='orderintake',
+            index=models.Index(fields=['status', 'created_at'], name='foodcartapp_status_27b289_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import migrations
+
+
+DEFAULT_BANNERS = [
+    ('Burger', 'burger.jpg', 'Tasty Burger at your door step'),
+    ('Spices', 'food.jpg', 'All Cuisines'),
+    ('New York', 'tasty.jpg', 'Food is incomplete without a tasty dessert'),
+]
+
+
+def create_default_banners(apps, schema_editor):
+    Banner = apps.get_model('foodcartapp', 'Banner')
+    for order, (title, filename, text) in enumerate(DEFAULT_BANNERS):
+        path = os.path.join(settings.BASE_DIR, 'assets', filename)
+        if not os.path.exists(path):
+            continue
+        banner = Banner(title=title, text=text, order=order)
+        # Reuse the copy left by a previous run instead of piling up
+        # suffixed duplicates in MEDIA_ROOT
+        stored_name = banner.image.field.generate_filename(banner, filename)
+        if default_storage.exists(stored_name):
+            banner.image.name = stored_name
+        else:
+            with open(path, 'rb') as image_file:
+                banner.image.save(filename, File(image_file), save=False)
+        banner.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0061_banner'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_default_banners, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.7 on 2026-10-18 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0062_create_default_banners'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_variants',
+            field=models.TextField(blank=True, editable=False, verbose_name='уменьшенные копии картинки в JSON'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.0.7 on 2026-10-18 20:27
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_available_restaurants(apps, schema_editor):
+    Product = apps.get_model('foodcartapp', 'Product')
+    RestaurantMenuItem = apps.get_model('foodcartapp', 'RestaurantMenuItem')
+    available_menu_items_count = RestaurantMenuItem.objects.filter(product=OuterRef('pk'), availability=True)\
+        .order_by().values('product').annotate(restaurants_count=Count('id')).values('restaurants_count')
+    Product.objects.update(available_restaurants_count=Coalesce(Subquery(available_menu_items_count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0063_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='available_restaurants_count',
+            field=models.IntegerField(db_index=True, default=0, editable=False, verbose_name='в продаже в ресторанах'),
+        ),
+        migrations.RunPython(count_available_restaurants, migrations.RunPython.noop),
+    ]
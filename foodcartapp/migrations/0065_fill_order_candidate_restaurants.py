@@ -0,0 +1,48 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def fill_candidate_restaurants(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    OrderProduct = apps.get_model('foodcartapp', 'OrderProduct')
+    RestaurantMenuItem = apps.get_model('foodcartapp', 'RestaurantMenuItem')
+    OrderCandidate = Order.candidate_restaurants.through
+
+    open_orders = Order.objects.exclude(status='completed')
+    orders_with_products = {order_id: [] for order_id in open_orders.values_list('id', flat=True)}
+    order_items = OrderProduct.objects.filter(order__in=open_orders).values_list('order', 'product')
+    for order_id, product in order_items:
+        orders_with_products[order_id].append(product)
+
+    product_restaurants = defaultdict(set)
+    menu_items = RestaurantMenuItem.objects.filter(availability=True)\
+        .values_list('restaurant', 'product')
+    for restaurant_id, product in menu_items:
+        product_restaurants[product].add(restaurant_id)
+    all_restaurants = set().union(*product_restaurants.values())
+
+    orders_restaurants = {}
+    for order_id, products in orders_with_products.items():
+        restaurant_ids = set(all_restaurants)
+        for product in products:
+            restaurant_ids &= product_restaurants.get(product, set())
+        orders_restaurants[order_id] = restaurant_ids
+
+    OrderCandidate.objects.filter(order__in=open_orders).delete()
+    OrderCandidate.objects.bulk_create([
+        OrderCandidate(order_id=order_id, restaurant_id=restaurant_id)
+        for order_id, restaurant_ids in orders_restaurants.items()
+        for restaurant_id in restaurant_ids
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0064_product_available_restaurants_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_candidate_restaurants, migrations.RunPython.noop),
+    ]
@@ -1,48 +1,52 @@
+import uuid
+
 from django.contrib.auth.models import User
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, transaction
 from phonenumber_field.modelfields import PhoneNumberField
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.db.models import Sum, F, ExpressionWrapper, DecimalField
+from django.db.models import Sum, F, ExpressionWrapper, DecimalField, Count, Subquery, OuterRef
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
-from collections import defaultdict
-import requests
-from StarBurger import settings
-from django.core.cache import cache
-from hashlib import sha1
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-
-def fetch_coordinates(apikey, place):
-    cache_key = sha1(place.encode()).hexdigest()
-    if cache.get(cache_key):
-        return cache.get(cache_key)
-    base_url = "https://geocode-maps.yandex.ru/1.x"
-    params = {"geocode": place, "apikey": apikey, "format": "json"}
-    response = requests.get(base_url, params=params)
-    response.raise_for_status()
-    places_found = response.json()['response']['GeoObjectCollection']['featureMember']
-    most_relevant = places_found[0]
-    lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
-    cache.set(cache_key, (lon, lat))
-    return lon, lat
-
-
-class Restaurant(models.Model):
+from places.geocoder import GeocodedMixin, enqueue_geocoding, locate_in_bulk
+from places.signals import coordinates_fetched
+from .banners import invalidate_banners
+from .catalog import schedule_catalog_invalidation
+from .images import generate_image_variants, get_image_variant_url
+from .matching import match_orders
+from .signals import order_products_created
+from .spatial_index import invalidate_restaurants_index
+from .tracking import FieldTrackerMixin
+
+
+class RestaurantQuerySet(models.QuerySet):
+    def able_to_cook(self, order):
+        order_products = set(OrderProduct.objects.filter(order=order).values_list('product', flat=True))
+        if not order_products:
+            return self.all()
+        return self.filter(menu_items__availability=True, menu_items__product__in=order_products)\
+            .annotate(available_order_products=Count('menu_items__product', distinct=True))\
+            .filter(available_order_products=len(order_products))
+
+
+class Restaurant(GeocodedMixin, models.Model):
     name = models.CharField('название', max_length=50)
     address = models.CharField('адрес', max_length=100, blank=True)
     contact_phone = models.CharField('контактный телефон', max_length=50, blank=True)
     lon = models.FloatField('Долгота', null=True, blank=True)
     lat = models.FloatField('Широта', null=True, blank=True)
 
+    objects = RestaurantQuerySet.as_manager()
+
     def save(self, *args, **kwargs):
-        try:
-            lon, lat = fetch_coordinates(settings.YANDEX_KEY, self.address)
-            self.lon = lon
-            self.lat = lat
-        except (ConnectionError, TypeError):
-            super(Restaurant, self).save(*args, **kwargs)
+        previous_coordinates = (self.lon, self.lat)
         super(Restaurant, self).save(*args, **kwargs)
+        if (self.lon, self.lat) != previous_coordinates:
+            transaction.on_commit(invalidate_restaurants_index)
 
     def __str__(self):
         return self.name
@@ -52,9 +56,21 @@ class Restaurant(models.Model):
         verbose_name_plural = 'рестораны'
 
 
+def count_available_restaurants():
+    available_menu_items_count = RestaurantMenuItem.objects.filter(product=OuterRef('pk'), availability=True)\
+        .order_by().values('product').annotate(restaurants_count=Count('id')).values('restaurants_count')
+    return Coalesce(Subquery(available_menu_items_count), 0)
+
+
 class ProductQuerySet(models.QuerySet):
     def available(self):
-        return self.distinct().filter(menu_items__availability=True)
+        return self.filter(available_restaurants_count__gt=0)
+
+    def with_actual_restaurants_count(self):
+        return self.annotate(actual_restaurants_count=count_available_restaurants())
+
+    def recount_available_restaurants(self):
+        return self.update(available_restaurants_count=count_available_restaurants())
 
 
 class ProductCategory(models.Model):
@@ -68,7 +84,7 @@ class ProductCategory(models.Model):
         return self.name
 
 
-class Product(models.Model):
+class Product(FieldTrackerMixin, models.Model):
     name = models.CharField('название', max_length=50)
     category = models.ForeignKey(ProductCategory, null=True, blank=True, on_delete=models.SET_NULL,
                                  verbose_name='категория', related_name='products')
@@ -76,24 +92,115 @@ class Product(models.Model):
         'цена', max_digits=8, decimal_places=2,
         validators=[MinValueValidator(0, message="Предлагаешь доплатить?")])
     image = models.ImageField('картинка')
+    image_variants = models.TextField('уменьшенные копии картинки в JSON', blank=True, editable=False)
+    available_restaurants_count = models.IntegerField(
+        'в продаже в ресторанах', default=0, db_index=True, editable=False)
     special_status = models.BooleanField('спец.предложение', default=False, db_index=True)
     description = models.TextField('описание', max_length=200, blank=True)
 
     objects = ProductQuerySet.as_manager()
 
+    tracked_fields = ['image']
+
+    def needs_image_variants(self, update_fields=None):
+        if update_fields is not None and 'image' not in update_fields:
+            return False
+        return bool(self.image) and (self.has_changed('image') or not self.image_variants)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.pk is None:
+            # A copy saved as a new product isn't on any menu yet
+            self.available_restaurants_count = 0
+        elif update_fields is None and not self._state.adding \
+                and not kwargs.get('force_insert'):
+            # The counter is kept by menu items with F() updates, a stale copy must not overwrite it
+            update_fields = kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'available_restaurants_count'
+            ]
+        if self.needs_image_variants(update_fields):
+            if not self.image._committed:
+                self.image.save(self.image.name, self.image.file, save=False)
+            try:
+                self.image_variants = generate_image_variants(self.image.name)
+            except OSError:
+                # A broken or missing image is still saved, just without resized copies
+                self.image_variants = ''
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'image_variants'}
+        super().save(*args, **kwargs)
+
+    def get_image_variant_url(self, width):
+        return get_image_variant_url(self.image, self.image_variants, width)
+
+    @property
+    def image_thumbnail_url(self):
+        return self.get_image_variant_url(160)
+
     def __str__(self):
         return self.name
 
     class Meta:
         verbose_name = 'товар'
         verbose_name_plural = 'товары'
+        indexes = [
+            models.Index(fields=['category', 'id']),
+            models.Index(fields=['special_status', 'id']),
+        ]
 
 
-class RestaurantMenuItem(models.Model):
+class RestaurantMenuItemQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic():
+            created = super().bulk_create(objs, *args, **kwargs)
+            products_ids = {menu_item.product_id for menu_item in created if menu_item.availability}
+            refresh_products_availability(products_ids)
+        return created
+
+    def update(self, **kwargs):
+        if not {'availability', 'product', 'product_id'} & kwargs.keys():
+            return super().update(**kwargs)
+        with transaction.atomic():
+            menu_items = dict(self.values_list('id', 'product_id'))
+            updated = super().update(**kwargs)
+            products_ids = {
+                *menu_items.values(),
+                *RestaurantMenuItem.objects.filter(id__in=menu_items).values_list('product_id', flat=True),
+            }
+            refresh_products_availability(products_ids)
+        return updated
+
+
+class RestaurantMenuItem(FieldTrackerMixin, models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='menu_items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='menu_items')
     availability = models.BooleanField('в продаже', default=True, db_index=True)
 
+    objects = RestaurantMenuItemQuerySet.as_manager()
+
+    tracked_fields = ['product_id', 'restaurant_id', 'availability']
+
+    def get_loaded_available_product_id(self):
+        loaded_values = getattr(self, '_loaded_values', {})
+        if loaded_values.get('availability', self.availability):
+            return loaded_values.get('product_id', self.product_id)
+        return None
+
+    def save(self, *args, **kwargs):
+        was_available_for = None if self._state.adding else self.get_loaded_available_product_id()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            is_available_for = self.product_id if self.availability else None
+            if was_available_for == is_available_for:
+                return
+            if was_available_for:
+                Product.objects.filter(id=was_available_for)\
+                    .update(available_restaurants_count=F('available_restaurants_count') - 1)
+            if is_available_for:
+                Product.objects.filter(id=is_available_for)\
+                    .update(available_restaurants_count=F('available_restaurants_count') + 1)
+
     def __str__(self):
         return f"{self.restaurant.name} - {self.product.name}"
 
@@ -103,47 +210,123 @@ class RestaurantMenuItem(models.Model):
         unique_together = [
             ['restaurant', 'product']
         ]
+        indexes = [models.Index(fields=['product', 'availability'])]
 
 
-class OrderQuerySet(models.QuerySet):
+def refresh_products_availability(products_ids):
+    """Recount availability of products whose menu items were changed in bulk, bypassing signals."""
+    Product.objects.filter(id__in=products_ids).recount_available_restaurants()
+    schedule_catalog_invalidation()
+    transaction.on_commit(
+        lambda: Order.objects.open().filter(order_items__product__in=products_ids).distinct()
+        .refresh_candidate_restaurants()
+    )
 
-    def fetch_orders_with_total_and_restaurants(self):
 
-        orders_products = OrderProduct.objects.values_list('order', 'product')
-        orders_with_products = defaultdict(list)
-        for set in orders_products:
-            orders_with_products[set[0]].append(set[1])
+class BannerQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(is_published=True)
+
+
+class Banner(models.Model):
+    title = models.CharField('заголовок', max_length=50)
+    image = models.ImageField('картинка', upload_to='banners')
+    text = models.CharField('текст', max_length=200, blank=True)
+    order = models.PositiveIntegerField('порядок', default=0)
+    is_published = models.BooleanField('опубликован', default=True)
+    active_from = models.DateTimeField('показывать с', null=True, blank=True)
+    active_until = models.DateTimeField('показывать до', null=True, blank=True)
+
+    objects = BannerQuerySet.as_manager()
+
+    def clean(self):
+        if self.active_from and self.active_until and self.active_until <= self.active_from:
+            raise ValidationError({'active_until': 'Баннер должен скрываться позже, чем появляется.'})
+
+    def __str__(self):
+        return self.title
+
+    class Meta:
+        ordering = ['order', 'id']
+        verbose_name = 'баннер'
+        verbose_name_plural = 'баннеры'
 
-        orders = self.all()
+
+class OrderQuerySet(models.QuerySet):
+
+    def open(self):
+        return self.exclude(status=Order.Status.completed)
+
+    def find_candidate_restaurants(self, restaurants=None):
+        orders_with_products = {order_id: [] for order_id in self.values_list('id', flat=True)}
+        order_items = OrderProduct.objects.filter(order__in=orders_with_products)\
+            .values_list('order', 'product')
+        for order_id, product in order_items:
+            orders_with_products[order_id].append(product)
+
+        products = {product for products in orders_with_products.values() for product in products}
+        menu_items = RestaurantMenuItem.objects.filter(availability=True, product__in=products)
+        if restaurants is not None:
+            menu_items = menu_items.filter(restaurant__in=restaurants)
+        return match_orders(orders_with_products, menu_items.values_list('restaurant', 'product'))
+
+    @transaction.atomic
+    def refresh_candidate_restaurants(self, restaurants=None):
+        orders_restaurants = self.find_candidate_restaurants(restaurants)
+        OrderCandidate = Order.candidate_restaurants.through
+        stale_candidates = OrderCandidate.objects.filter(order__in=orders_restaurants)
+        if restaurants is not None:
+            stale_candidates = stale_candidates.filter(restaurant__in=restaurants)
+        stale_candidates.delete()
+        OrderCandidate.objects.bulk_create([
+            OrderCandidate(order_id=order_id, restaurant_id=restaurant_id)
+            for order_id, restaurant_ids in orders_restaurants.items()
+            for restaurant_id in restaurant_ids
+        ])
+
+    @transaction.atomic
+    def bulk_register(self, orders_fields):
+        orders = [
+            Order(
+                firstname=fields['firstname'],
+                lastname=fields['lastname'],
+                phonenumber=fields['phonenumber'],
+                address=fields['address'],
+            )
+            for fields in orders_fields
+        ]
+        unlocated_orders = locate_in_bulk(orders)
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.bulk_create(orders)
+        else:
+            for order in orders:
+                order.save()
+        if unlocated_orders and settings.GEOCODING_MODE == 'deferred':
+            enqueue_geocoding(unlocated_orders)
+
+        OrderProduct.objects.bulk_create([
+            OrderProduct(order=order, **product_fields)
+            for order, fields in zip(orders, orders_fields)
+            for product_fields in fields['products']
+        ])
+        return orders
+
+    def fetch_orders_with_total_and_restaurants(self):
+        orders = self.prefetch_related('candidate_restaurants')
         orders_total_price = OrderProduct.objects.values('order').\
             annotate(order_total=ExpressionWrapper(Sum(F('quantity') * F('price')),
                      output_field=DecimalField()))
         orders_total_price = orders_total_price.values_list('order_id', 'order_total')
         orders_total_price = dict(orders_total_price)
 
-        restaurant_menu_items = RestaurantMenuItem.objects.all()
-        restaurant_menu_items = restaurant_menu_items \
-                .filter(availability=True).values_list('restaurant__name',
-                                                       'product',
-                                                       'restaurant__lon',
-                                                       'restaurant__lat')
-        restaurants_with_products = defaultdict(list)
-        for set in restaurant_menu_items:
-            restaurants_with_products[(set[0], set[3], set[2])].append(set[1])
-
         for order in orders:
-            restaurants = []
-            products_set = orders_with_products[order.id]
-            for restaurant, products in restaurants_with_products.items():
-                if {*products_set}.issubset({*products}):
-                    restaurants.append({restaurant[0]: (restaurant[1], restaurant[2])})
-            order.restaurants = restaurants
-
+            order.restaurants = [{restaurant.name: (restaurant.lat, restaurant.lon)}
+                                 for restaurant in order.candidate_restaurants.all()]
             order.total_price = orders_total_price[order.id]
         return orders
 
 
-class Order(models.Model):
+class Order(GeocodedMixin, models.Model):
     firstname = models.CharField('Имя', max_length=30)
     lastname = models.CharField('Фамилия', max_length=30)
     phonenumber = PhoneNumberField('Мобильный номер')
@@ -172,17 +355,14 @@ class Order(models.Model):
     restaurant = models.ForeignKey(Restaurant, blank=True, null=True, on_delete=models.SET_NULL)
     lon = models.FloatField('Долгота', null=True, blank=True)
     lat = models.FloatField('Широта', null=True, blank=True)
+    candidate_restaurants = models.ManyToManyField(
+        Restaurant, related_name='candidate_orders', blank=True, editable=False,
+        verbose_name='Рестораны, способные приготовить заказ')
 
-    def save(self, *args, **kwargs):
-        try:
-            lon, lat = fetch_coordinates(settings.YANDEX_KEY, self.address)
-            self.lon = lon
-            self.lat = lat
-        except (ConnectionError, TypeError):
-            super(Order, self).save(*args, **kwargs)
-        super(Order, self).save(*args, **kwargs)
     objects = OrderQuerySet.as_manager()
 
+    tracked_fields = ['address', 'status']
+
     @property
     def total(self):
         total = self.order_items.annotate(
@@ -194,17 +374,7 @@ class Order(models.Model):
 
     @property
     def order_restaurants(self):
-        products_set = self.order_items.values_list('product', flat=True)
-        restaurants_and_products = RestaurantMenuItem.objects\
-            .filter(availability=True).values_list('restaurant', 'product')
-        restaurants_with_products = defaultdict(list)
-        restaurants = []
-        for set in restaurants_and_products:
-            restaurants_with_products[set[0]].append(set[1])
-        for restaurant, products in restaurants_with_products.items():
-            if {*products_set}.issubset({*products}):
-                restaurants.append(restaurant)
-        return Restaurant.objects.filter(id__in=restaurants)
+        return Restaurant.objects.able_to_cook(self)
 
     def __str__(order):
         return f'{order.firstname} {order.lastname} {order.address}'
@@ -214,11 +384,27 @@ class Order(models.Model):
         verbose_name_plural = 'Заказы'
 
 
-class BulkCreateManager(models.Manager):
+class OrderProductManager(models.Manager):
     def bulk_create(self, objs, **kwargs):
-        super().bulk_create(objs, **kwargs)
-        for item in objs:
-            post_save.send(item.__class__, instance=item, created=True)
+        objs = list(objs)
+        snapshot_prices(objs)
+        created = super().bulk_create(objs, **kwargs)
+        order_products_created.send(sender=self.model, instances=created)
+        return created
+
+
+def snapshot_prices(order_products):
+    unpriced_items = [item for item in order_products if item.price is None]
+    uncached_products = {
+        item.product_id for item in unpriced_items if not OrderProduct.product.is_cached(item)
+    }
+    prices = dict(Product.objects.filter(id__in=uncached_products).values_list('id', 'price')) \
+        if uncached_products else {}
+    for item in unpriced_items:
+        if OrderProduct.product.is_cached(item):
+            item.price = item.product.price
+        else:
+            item.price = prices[item.product_id]
 
 
 class OrderProduct(models.Model):
@@ -229,7 +415,7 @@ class OrderProduct(models.Model):
     quantity = models.IntegerField('Количество', default=1)
     price = models.DecimalField('цена', max_digits=8,
                                 decimal_places=2, validators=[MinValueValidator(0)])
-    objects = BulkCreateManager()
+    objects = OrderProductManager()
 
     class Meta:
         unique_together = ['order', 'product']
@@ -240,10 +426,122 @@ class OrderProduct(models.Model):
         return f"{self.product.name} - {self.order}"
 
 
-@receiver(post_save, sender=OrderProduct)
-def set_order_price(sender, instance, created, **kwargs):
-    if created:
-        price = instance.product.price
-        order_product = OrderProduct.objects.get(order=instance.order.id, product=instance.product.id)
-        order_product.price = price
-        order_product.save()
+class OrderIntake(models.Model):
+    class Status(models.TextChoices):
+        queued = 'queued', _('В очереди')
+        registered = 'registered', _('Оформлен')
+        rejected = 'rejected', _('Отклонён')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    payload = models.TextField('Данные заказа в JSON')
+    status = models.CharField(
+        'Статус', max_length=10, choices=Status.choices, default=Status.queued)
+    created_at = models.DateTimeField('Принят в очередь', default=timezone.now)
+    processed_at = models.DateTimeField('Обработан', blank=True, null=True)
+    order = models.ForeignKey(Order, related_name='intakes', blank=True, null=True,
+                              on_delete=models.SET_NULL, verbose_name='Заказ')
+    errors = models.TextField('Ошибки проверки в JSON', blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'])]
+        verbose_name = 'Заявка на заказ'
+        verbose_name_plural = 'Очередь заявок на заказ'
+
+    def __str__(self):
+        return f'{self.id} {self.get_status_display()}'
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField('Ключ', max_length=255, unique=True)
+    request_hash = models.CharField('Хэш запроса', max_length=64)
+    status_code = models.PositiveSmallIntegerField('Код ответа', null=True, blank=True)
+    headers = models.TextField('Заголовки ответа в JSON', blank=True)
+    response = models.TextField('Ответ в JSON', blank=True)
+    created_at = models.DateTimeField('Создан', default=timezone.now)
+    expires_at = models.DateTimeField('Действует до', db_index=True)
+
+    class Meta:
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+
+    def __str__(self):
+        return self.key
+
+
+@receiver(pre_save, sender=OrderProduct)
+def set_order_price(sender, instance, **kwargs):
+    if instance._state.adding:
+        snapshot_prices([instance])
+
+
+@receiver([post_save, post_delete], sender=OrderProduct)
+def refresh_order_candidate_restaurants(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: Order.objects.filter(id=instance.order_id).open().refresh_candidate_restaurants()
+    )
+
+
+@receiver(post_save, sender=Order)
+def refresh_reopened_order_candidate_restaurants(sender, instance, **kwargs):
+    # Candidates of completed orders aren't kept up to date, a reopened order needs them again
+    loaded_status = getattr(instance, '_loaded_values', {}).get('status')
+    if loaded_status == Order.Status.completed and instance.status != Order.Status.completed:
+        transaction.on_commit(
+            lambda: Order.objects.filter(id=instance.id).refresh_candidate_restaurants()
+        )
+
+
+@receiver(order_products_created, sender=OrderProduct)
+def refresh_orders_candidate_restaurants(sender, instances, **kwargs):
+    orders_ids = {instance.order_id for instance in instances}
+    transaction.on_commit(
+        lambda: Order.objects.filter(id__in=orders_ids).open().refresh_candidate_restaurants()
+    )
+
+
+@receiver([post_save, post_delete], sender=RestaurantMenuItem)
+def refresh_product_candidate_restaurants(sender, instance, **kwargs):
+    # A menu item moved to another product or restaurant changes candidates for both pairs
+    loaded_values = getattr(instance, '_loaded_values', {})
+    menu_pairs = {
+        (instance.product_id, instance.restaurant_id),
+        (loaded_values.get('product_id', instance.product_id),
+         loaded_values.get('restaurant_id', instance.restaurant_id)),
+    }
+
+    def refresh_candidate_restaurants():
+        for product_id, restaurant_id in menu_pairs:
+            Order.objects.open().filter(order_items__product=product_id)\
+                .refresh_candidate_restaurants(restaurants=[restaurant_id])
+
+    transaction.on_commit(refresh_candidate_restaurants)
+
+
+@receiver(post_delete, sender=RestaurantMenuItem)
+def decrease_available_restaurants_count(sender, instance, **kwargs):
+    available_product_id = instance.get_loaded_available_product_id()
+    if available_product_id:
+        Product.objects.filter(id=available_product_id)\
+            .update(available_restaurants_count=F('available_restaurants_count') - 1)
+
+
+@receiver(post_delete, sender=Restaurant)
+def drop_restaurant_from_index(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_restaurants_index)
+
+
+@receiver(coordinates_fetched, sender=Restaurant)
+def add_restaurant_to_index(sender, **kwargs):
+    transaction.on_commit(invalidate_restaurants_index)
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductCategory)
+@receiver([post_save, post_delete], sender=RestaurantMenuItem)
+def bump_catalog_version(sender, **kwargs):
+    schedule_catalog_invalidation()
+
+
+@receiver([post_save, post_delete], sender=Banner)
+def bump_banners_version(sender, **kwargs):
+    transaction.on_commit(invalidate_banners)
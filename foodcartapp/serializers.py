@@ -0,0 +1,102 @@
+from collections import Counter
+
+from rest_framework.serializers import ModelSerializer, ListField, PrimaryKeyRelatedField, ValidationError
+
+from .models import Order, Product, OrderProduct
+
+
+class PrefetchedPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    prefetched_objects = None
+
+    def get_pk(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            raise TypeError
+        return self.get_queryset().model._meta.pk.get_prep_value(data)
+
+    def prefetch(self, values):
+        pks = set()
+        for value in values:
+            try:
+                pks.add(self.get_pk(value))
+            except (TypeError, ValueError, ValidationError):
+                continue
+        self.prefetched_objects = self.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        if self.prefetched_objects is None:
+            return super().to_internal_value(data)
+        try:
+            pk = self.get_pk(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in self.prefetched_objects:
+            self.fail('does_not_exist', pk_value=data)
+        return self.prefetched_objects[pk]
+
+
+class OrderProductSerializer(ModelSerializer):
+    product = PrefetchedPrimaryKeyRelatedField(queryset=Product.objects.all())
+
+    class Meta:
+        model = OrderProduct
+        fields = ['product', 'quantity']
+
+
+class OrderProductsField(ListField):
+    def run_child_validation(self, data):
+        product_field = self.child.fields['product']
+        prefetched_products = self.context.get('prefetched_products')
+        if prefetched_products is None:
+            product_field.prefetch(item.get('product') for item in data if isinstance(item, dict))
+        else:
+            product_field.prefetched_objects = prefetched_products
+        return super().run_child_validation(data)
+
+
+class OrderSerializer(ModelSerializer):
+    products = OrderProductsField(
+        child=OrderProductSerializer(), allow_empty=False, write_only=True
+    )
+
+    class Meta:
+        model = Order
+        fields = ['id', 'firstname', 'lastname', 'phonenumber', 'address', 'products']
+        read_only_fields = ['id']
+
+    def validate_products(self, products):
+        products_count = Counter(fields['product'].id for fields in products)
+        repeated_ids = sorted(product_id for product_id, count in products_count.items() if count > 1)
+        if repeated_ids:
+            raise ValidationError(
+                'Продукты не должны повторяться в заказе: {}.'.format(', '.join(map(str, repeated_ids)))
+            )
+        return products
+
+
+def register_orders(orders_fields):
+    """Validate and register orders together, return a result for each of them."""
+    product_field = OrderProductSerializer().fields['product']
+    product_field.prefetch(
+        item.get('product')
+        for order_fields in orders_fields if isinstance(order_fields, dict)
+        if isinstance(order_fields.get('products'), list)
+        for item in order_fields['products'] if isinstance(item, dict)
+    )
+    serializer = OrderSerializer(context={'prefetched_products': product_field.prefetched_objects})
+    validated_orders = []
+    for order_fields in orders_fields:
+        try:
+            validated_orders.append(serializer.run_validation(order_fields))
+        except ValidationError as error:
+            validated_orders.append(error)
+
+    orders = iter(Order.objects.bulk_register([
+        order_fields for order_fields in validated_orders if not isinstance(order_fields, ValidationError)
+    ]))
+    return [
+        {'errors': order_fields.detail} if isinstance(order_fields, ValidationError)
+        else {'order': serializer.to_representation(next(orders))}
+        for order_fields in validated_orders
+    ]
@@ -0,0 +1,104 @@
+"""Publish the catalog as immutable static files a web server or CDN can serve on its own."""
+import gzip
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .banners import get_active_banners
+from .catalog import ALL_PRODUCTS, get_catalog_version, iter_catalog_json
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+SNAPSHOT_POINTER_CACHE_KEY = 'catalog_snapshot'
+
+
+def get_snapshots_dir():
+    return os.path.join(settings.STATIC_ROOT, settings.CATALOG_SNAPSHOTS_DIR)
+
+
+def get_snapshot_url(filename):
+    return f'{settings.STATIC_URL}{settings.CATALOG_SNAPSHOTS_DIR}/{filename}'
+
+
+def write_snapshot(name, chunks):
+    snapshots_dir = get_snapshots_dir()
+    os.makedirs(snapshots_dir, exist_ok=True)
+    temp_path = os.path.join(snapshots_dir, f'.{name}.{os.getpid()}.tmp')
+    content_hash = hashlib.sha256()
+    with open(temp_path, 'wb') as snapshot_file:
+        for chunk in chunks:
+            chunk = chunk.encode()
+            content_hash.update(chunk)
+            snapshot_file.write(chunk)
+
+    filename = f'{name}.{content_hash.hexdigest()[:12]}.json'
+    path = os.path.join(snapshots_dir, filename)
+    if os.path.exists(path):
+        os.remove(temp_path)
+        # Refresh the age of a republished snapshot, so cleanup does not take it for a stale one
+        os.utime(path)
+        return filename
+
+    with open(temp_path, 'rb') as snapshot_file:
+        content = snapshot_file.read()
+    with open(f'{temp_path}.gz', 'wb') as compressed_file:
+        compressed_file.write(gzip.compress(content, compresslevel=9))
+    os.replace(f'{temp_path}.gz', f'{path}.gz')
+    if brotli:
+        with open(f'{temp_path}.br', 'wb') as compressed_file:
+            compressed_file.write(brotli.compress(content))
+        os.replace(f'{temp_path}.br', f'{path}.br')
+    # The plain file goes last, so its presence means the variants are there too
+    os.replace(temp_path, path)
+    return filename
+
+
+def remove_stale_snapshots(name, keep):
+    snapshots_dir = get_snapshots_dir()
+    snapshots = [
+        filename for filename in os.listdir(snapshots_dir)
+        if filename.startswith(f'{name}.') and filename.endswith('.json')
+    ]
+    snapshots.sort(key=lambda filename: os.path.getmtime(os.path.join(snapshots_dir, filename)), reverse=True)
+    for filename in snapshots[keep:]:
+        for suffix in ['', '.gz', '.br']:
+            path = os.path.join(snapshots_dir, filename + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def publish_catalog_snapshot():
+    version = get_catalog_version()
+    active_banners = get_active_banners()
+    pointer = {
+        'version': version,
+        'banners_etag': active_banners.etag,
+        'products': get_snapshot_url(write_snapshot('products', iter_catalog_json(version, ALL_PRODUCTS))),
+        'banners': get_snapshot_url(write_snapshot('banners', [active_banners.json])),
+    }
+    for name in ['products', 'banners']:
+        remove_stale_snapshots(name, settings.CATALOG_SNAPSHOTS_KEEP)
+    cache.set(SNAPSHOT_POINTER_CACHE_KEY, pointer, None)
+    return pointer
+
+
+def get_snapshot_pointer():
+    """Return URLs of the published snapshots, None for the ones that have gone stale."""
+    pointer = cache.get(SNAPSHOT_POINTER_CACHE_KEY) or {}
+    products_are_fresh = pointer.get('version') == get_catalog_version()
+    banners_are_fresh = pointer.get('banners_etag') == get_active_banners().etag
+    return {
+        'products': pointer['products'] if products_are_fresh else None,
+        'banners': pointer['banners'] if banners_are_fresh else None,
+    }
+
+
+def is_snapshot_stale():
+    pointer = get_snapshot_pointer()
+    return not pointer['products'] or not pointer['banners']
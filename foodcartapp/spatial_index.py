@@ -0,0 +1,114 @@
+import math
+from collections import defaultdict
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .distances import calculate_distances
+
+CELL_SIZE_DEGREES = 0.25
+KM_PER_DEGREE = 111.32
+MAX_LATITUDE = 89.9
+INDEX_VERSION_CACHE_KEY = 'restaurants_spatial_index_version'
+
+
+class RestaurantsSpatialIndex:
+    """Restaurants bucketed into a lat/lon grid.
+
+    A radius query only scans the cells overlapping the bounding box of the
+    search circle, so adding restaurants in other cities doesn't slow it down.
+    """
+
+    def __init__(self, restaurants):
+        self.cells = defaultdict(list)
+        for restaurant_id, lat, lon in restaurants:
+            self.cells[self.get_cell(lat, lon)].append((restaurant_id, lat, lon))
+
+    @staticmethod
+    def get_cell(lat, lon):
+        return math.floor(lat / CELL_SIZE_DEGREES), math.floor(lon / CELL_SIZE_DEGREES)
+
+    def find_nearby(self, lat, lon, radius_km):
+        lat_delta = radius_km / KM_PER_DEGREE
+        widest_lat = min(abs(lat) + lat_delta, MAX_LATITUDE)
+        lon_delta = min(radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest_lat))), 180)
+        min_row, min_column = self.get_cell(lat - lat_delta, lon - lon_delta)
+        max_row, max_column = self.get_cell(lat + lat_delta, lon + lon_delta)
+
+        if (max_row - min_row + 1) * (max_column - min_column + 1) > len(self.cells):
+            cells = [
+                restaurants for (row, column), restaurants in self.cells.items()
+                if min_row <= row <= max_row and min_column <= column <= max_column
+            ]
+        else:
+            cells = [
+                self.cells.get((row, column), [])
+                for row in range(min_row, max_row + 1)
+                for column in range(min_column, max_column + 1)
+            ]
+        return [restaurant for restaurants in cells for restaurant in restaurants]
+
+    def find_nearest_in_bulk(self, points, radius_km, limit=None):
+        """Find nearest restaurants for many points with one distance calculation.
+
+        `points` maps a key to `(lat, lon, restaurant_ids)`, the result maps
+        the same keys to `[(restaurant_id, distance), ...]` sorted by distance.
+        """
+        pairs = [
+            (key, restaurant_id, (lat, lon), (restaurant_lat, restaurant_lon))
+            for key, (lat, lon, restaurant_ids) in points.items()
+            for restaurant_id, restaurant_lat, restaurant_lon in self.find_nearby(lat, lon, radius_km)
+            if restaurant_ids is None or restaurant_id in restaurant_ids
+        ]
+        nearest = {key: [] for key in points}
+        if pairs:
+            distances = calculate_distances(
+                [origin for _, _, origin, _ in pairs],
+                [destination for _, _, _, destination in pairs],
+            )
+            for (key, restaurant_id, _, _), restaurant_distance in zip(pairs, distances):
+                if restaurant_distance <= radius_km:
+                    nearest[key].append((float(restaurant_distance), restaurant_id))
+        return {
+            key: [(restaurant_id, restaurant_distance)
+                  for restaurant_distance, restaurant_id in sorted(restaurants)[:limit]]
+            for key, restaurants in nearest.items()
+        }
+
+    def find_nearest(self, lat, lon, radius_km, limit=None, restaurant_ids=None):
+        return self.find_nearest_in_bulk({None: (lat, lon, restaurant_ids)}, radius_km, limit)[None]
+
+
+_restaurants_index = None
+_restaurants_index_version = None
+
+
+def get_restaurants_index():
+    global _restaurants_index, _restaurants_index_version
+    from .models import Restaurant
+
+    version = cache.get(INDEX_VERSION_CACHE_KEY)
+    if _restaurants_index is None or version != _restaurants_index_version:
+        restaurants = Restaurant.objects.filter(lat__isnull=False, lon__isnull=False)\
+            .values_list('id', 'lat', 'lon')
+        _restaurants_index = RestaurantsSpatialIndex(restaurants)
+        _restaurants_index_version = version
+    return _restaurants_index
+
+
+def invalidate_restaurants_index():
+    cache.set(INDEX_VERSION_CACHE_KEY, uuid4().hex, None)
+
+
+def find_nearest_restaurants_in_bulk(points, limit=None, radius_km=None):
+    return get_restaurants_index().find_nearest_in_bulk(
+        points,
+        radius_km=radius_km or settings.RESTAURANTS_SEARCH_RADIUS_KM,
+        limit=limit or settings.NEAREST_RESTAURANTS_LIMIT,
+    )
+
+
+def find_nearest_restaurants(lat, lon, restaurant_ids=None, limit=None, radius_km=None):
+    nearest = find_nearest_restaurants_in_bulk({None: (lat, lon, restaurant_ids)}, limit, radius_km)
+    return nearest[None]
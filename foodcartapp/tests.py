@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase
+
+from .distances import calculate_distances
+
+
+class DistancesTest(SimpleTestCase):
+    # Orders and restaurants in Moscow plus a few long and meridional pairs,
+    # where the sphere differs from the WGS-84 ellipsoid the most
+    origins = [
+        (55.7539, 37.6208),
+        (55.7539, 37.6208),
+        (55.6558, 37.5286),
+        (55.8813, 37.6613),
+        (59.9386, 30.3141),
+        (55.7539, 37.6208),
+        (43.1056, 131.8735),
+        (0.0, 30.0),
+    ]
+    destinations = [
+        (55.7601, 37.6186),
+        (55.7312, 37.6500),
+        (55.8010, 37.5300),
+        (55.6110, 37.7410),
+        (55.7539, 37.6208),
+        (54.9833, 82.8964),
+        (69.3498, 88.2011),
+        (1.0, 30.0),
+    ]
+
+    def test_haversine_error_against_geodesic(self):
+        fast = calculate_distances(self.origins, self.destinations, 'haversine')
+        exact = calculate_distances(self.origins, self.destinations, 'geodesic')
+
+        max_relative_error = max(abs(fast - exact) / exact)
+        self.assertLess(max_relative_error, 0.006)
+
+    def test_modes_agree_on_short_distances(self):
+        fast = calculate_distances(self.origins[:4], self.destinations[:4], 'haversine')
+        exact = calculate_distances(self.origins[:4], self.destinations[:4], 'geodesic')
+
+        for fast_distance, exact_distance in zip(fast, exact):
+            self.assertAlmostEqual(fast_distance, exact_distance, delta=0.1)
@@ -0,0 +1,23 @@
+class FieldTrackerMixin:
+    tracked_fields = []
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_tracked_fields()
+        return instance
+
+    def remember_tracked_fields(self):
+        self._loaded_values = {
+            field: self.__dict__[field] for field in self.tracked_fields if field in self.__dict__
+        }
+
+    def has_changed(self, field):
+        if field not in self.__dict__:
+            return False
+        loaded_values = getattr(self, '_loaded_values', {})
+        return field not in loaded_values or loaded_values[field] != self.__dict__[field]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.remember_tracked_fields()
@@ -1,12 +1,16 @@
 from django.urls import path
 
-from .views import product_list_api, banners_list_api, register_order
+from .views import product_list_api, banners_list_api, bootstrap_api, catalog_snapshot_api, register_order, register_orders_batch, order_intake_status
 
 
 app_name = "foodcartapp"
 
 urlpatterns = [
-    path('products/', product_list_api),
-    path('banners/', banners_list_api),
+    path('products/', product_list_api, name='products'),
+    path('banners/', banners_list_api, name='banners'),
+    path('catalog/', catalog_snapshot_api, name='catalog_snapshot'),
+    path('bootstrap/', bootstrap_api, name='bootstrap'),
     path('order/', register_order),
+    path('order/batch/', register_orders_batch),
+    path('order/intake/<uuid:intake_id>/', order_intake_status, name='order_intake'),
 ]
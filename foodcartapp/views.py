@@ -1,95 +1,159 @@
-from django.http import JsonResponse
-from django.templatetags.static import static
-from .models import Order, Product, OrderProduct
+import hashlib
+import json
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render, reverse
+from django.views.decorators.http import condition
+from .banners import get_active_banners
+from .catalog import (
+    ALL_PRODUCTS, get_bootstrap_json, get_cached_catalog_json, get_catalog_json, get_catalog_version,
+    get_query_params, iter_catalog_json, parse_catalog_query,
+)
+from .idempotency import idempotent
+from .intake import enqueue_order
+from .models import Order, OrderProduct, OrderIntake
+from .serializers import OrderSerializer, register_orders
+from .snapshots import get_snapshot_pointer
+from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from rest_framework.serializers import ModelSerializer, ListField
+from rest_framework.serializers import ValidationError
+from django.conf import settings
 from django.db import transaction
 
 
+def is_pretty_requested(request):
+    return settings.DEBUG or request.GET.get('pretty') == '1'
+
+
+def get_banners_etag(request):
+    request.active_banners = get_active_banners()
+    if is_pretty_requested(request):
+        return f'{request.active_banners.etag}-pretty'
+    return request.active_banners.etag
+
+
+@condition(etag_func=get_banners_etag)
 def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
-        {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
-        }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    if is_pretty_requested(request):
+        return JsonResponse(request.active_banners.banners, safe=False, json_dumps_params={
+            'ensure_ascii': False,
+            'indent': 4,
+        })
+    return HttpResponse(request.active_banners.json, content_type='application/json')
 
 
+def get_catalog_etag(request):
+    try:
+        request.catalog_query = parse_catalog_query(request.GET)
+    except ValueError as error:
+        request.catalog_query_error = str(error)
+        return None
+
+    request.catalog_version = get_catalog_version()
+    etag = request.catalog_version
+    if request.catalog_query != ALL_PRODUCTS:
+        etag += '-' + hashlib.md5(get_query_params(request.catalog_query).encode()).hexdigest()[:12]
+    if is_pretty_requested(request):
+        etag += '-pretty'
+    return etag
+
+
+@condition(etag_func=get_catalog_etag)
 def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            },
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    if hasattr(request, 'catalog_query_error'):
+        return JsonResponse({'detail': request.catalog_query_error}, status=400, json_dumps_params={
+            'ensure_ascii': False,
+        })
+
+    pretty = is_pretty_requested(request)
+    if request.catalog_query.limit:
+        catalog_json = get_catalog_json(request.catalog_version, request.catalog_query, pretty)
+        return HttpResponse(catalog_json, content_type='application/json')
 
+    catalog_json = get_cached_catalog_json(request.catalog_version, request.catalog_query, pretty)
+    if catalog_json is None:
+        return StreamingHttpResponse(
+            iter_catalog_json(request.catalog_version, request.catalog_query, pretty),
+            content_type='application/json',
+        )
+    return HttpResponse(catalog_json, content_type='application/json')
 
-class OrderProductSerializer(ModelSerializer):
-    class Meta:
-        model = OrderProduct
-        fields = ['product', 'quantity']
 
+def get_bootstrap_etag(request):
+    request.catalog_version = get_catalog_version()
+    request.active_banners = get_active_banners()
+    return f'{request.catalog_version}-{request.active_banners.etag}'
 
-class OrderSerializer(ModelSerializer):
-    products = ListField(
-        child=OrderProductSerializer(), allow_empty=False, write_only=True
-    )
 
-    class Meta:
-        model = Order
-        fields = ['id', 'firstname', 'lastname', 'phonenumber', 'address', 'products']
-        read_only_fields = ['id']
+@condition(etag_func=get_bootstrap_etag)
+def bootstrap_api(request):
+    bootstrap_json = get_bootstrap_json(request.catalog_version, request.active_banners)
+    return HttpResponse(bootstrap_json, content_type='application/json')
+
+
+def start_page(request):
+    bootstrap_json = get_bootstrap_json() if settings.STOREFRONT_BOOTSTRAP else None
+    return render(request, 'index.html', context={'bootstrap_json': bootstrap_json})
+
+
+def catalog_snapshot_api(request):
+    pointer = get_snapshot_pointer()
+    response = JsonResponse({
+        'products': pointer['products'] or reverse('foodcartapp:products'),
+        'banners': pointer['banners'] or reverse('foodcartapp:banners'),
+    })
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 
 @api_view(['POST'])
-@transaction.atomic
+@idempotent
 def register_order(request):
     serializer = OrderSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
 
-    order = Order.objects.create(
-        firstname=serializer.validated_data['firstname'],
-        lastname=serializer.validated_data['lastname'],
-        phonenumber=serializer.validated_data['phonenumber'],
-        address=serializer.validated_data['address']
-    )
+    if settings.ORDER_INTAKE_MODE == 'queue':
+        intake = enqueue_order(request.data)
+        status_url = reverse('foodcartapp:order_intake', args=[intake.id])
+        return Response(
+            {'id': intake.id, 'status': intake.status},
+            status=status.HTTP_202_ACCEPTED, headers={'Location': status_url},
+        )
+
+    with transaction.atomic():
+        order = Order.objects.create(
+            firstname=serializer.validated_data['firstname'],
+            lastname=serializer.validated_data['lastname'],
+            phonenumber=serializer.validated_data['phonenumber'],
+            address=serializer.validated_data['address']
+        )
 
-    products_fields = serializer.validated_data['products']
-    products = [OrderProduct(order=order, **fields) for fields in products_fields]
-    OrderProduct.objects.bulk_create(products)
+        products_fields = serializer.validated_data['products']
+        products = [OrderProduct(order=order, **fields) for fields in products_fields]
+        OrderProduct.objects.bulk_create(products)
     serialaizer = OrderSerializer(order)
     return Response(serialaizer.data)
+
+
+@api_view(['GET'])
+def order_intake_status(request, intake_id):
+    intake = get_object_or_404(OrderIntake.objects.select_related('order'), id=intake_id)
+    dumped_intake = {'id': intake.id, 'status': intake.status}
+    if intake.status == OrderIntake.Status.registered and intake.order:
+        dumped_intake['order'] = OrderSerializer(intake.order).data
+    if intake.status == OrderIntake.Status.rejected:
+        dumped_intake['errors'] = json.loads(intake.errors)
+    return Response(dumped_intake)
+
+
+@api_view(['POST'])
+@idempotent
+def register_orders_batch(request):
+    if not isinstance(request.data, list):
+        raise ValidationError({'non_field_errors': ['Ожидался список заказов.']})
+    if len(request.data) > settings.ORDERS_BATCH_MAX_SIZE:
+        raise ValidationError({'non_field_errors': [
+            f'В одном запросе не больше {settings.ORDERS_BATCH_MAX_SIZE} заказов.'
+        ]})
+    return Response(register_orders(request.data))
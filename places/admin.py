@@ -0,0 +1,34 @@
+from django.contrib import admin
+
+from .models import Place, GeocodingTask
+
+
+@admin.register(Place)
+class PlaceAdmin(admin.ModelAdmin):
+    search_fields = [
+        'address',
+    ]
+    list_display = [
+        'address',
+        'lon',
+        'lat',
+        'status',
+        'fetched_at',
+    ]
+    list_filter = [
+        'status',
+    ]
+
+
+@admin.register(GeocodingTask)
+class GeocodingTaskAdmin(admin.ModelAdmin):
+    list_display = [
+        'target',
+        'address',
+        'attempts',
+        'scheduled_at',
+        'last_error',
+    ]
+    list_filter = [
+        'content_type',
+    ]
@@ -0,0 +1,173 @@
+import random
+import threading
+import time
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F, Value
+from django.db.models.functions import Least
+from requests.adapters import HTTPAdapter
+
+from .models import RateLimitBucket
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class GeocoderError(Exception):
+    pass
+
+
+class GeocoderUnavailable(GeocoderError):
+    pass
+
+
+class GeocoderThrottled(GeocoderUnavailable):
+    pass
+
+
+class AddressNotFound(GeocoderError):
+    pass
+
+
+class TokenBucket:
+    """Rate limiter shared by all worker processes through a database row.
+
+    A token is taken by a single conditional UPDATE which refills the bucket
+    for the elapsed time, so concurrent processes can't overspend the quota.
+    The UPDATE runs on the `using` connection in autocommit, outside of any
+    transaction the caller has open.
+    """
+
+    def __init__(self, name, rate, capacity, using=DEFAULT_DB_ALIAS):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.using = using
+
+    def try_acquire(self):
+        now = time.time()
+        refilled_tokens = Least(
+            Value(float(self.capacity)),
+            F('tokens') + (now - F('refilled_at')) * self.rate,
+        )
+        acquired = RateLimitBucket.objects.using(self.using)\
+            .filter(name=self.name, tokens__gte=1 - (now - F('refilled_at')) * self.rate)\
+            .update(tokens=refilled_tokens - 1, refilled_at=now)
+        if acquired:
+            return True
+        _, created = RateLimitBucket.objects.using(self.using).get_or_create(name=self.name, defaults={
+            'tokens': self.capacity - 1,
+            'refilled_at': now,
+        })
+        return created
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while not self.try_acquire():
+            if time.monotonic() >= deadline:
+                raise GeocoderThrottled('Исчерпан лимит запросов к геокодеру')
+            time.sleep(random.uniform(0.5, 1) / self.rate)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, recovery_timeout):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def check(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                raise GeocoderThrottled('Геокодер недоступен, запросы временно не отправляются')
+            self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class YandexGeocoder:
+    def __init__(self, apikey, url, timeout, max_retries, backoff, rate_limiter, circuit_breaker,
+                 rate_limit_timeout, pool_size):
+        self.apikey = apikey
+        self.url = url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.rate_limit_timeout = rate_limit_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, params):
+        self.circuit_breaker.check()
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+            self.rate_limiter.acquire(self.rate_limit_timeout)
+            try:
+                response = self.session.get(self.url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                last_error = error
+                continue
+            if response.status_code in RETRY_STATUS_CODES:
+                last_error = requests.HTTPError(f'{response.status_code} от геокодера', response=response)
+                continue
+            self.circuit_breaker.record_success()
+            try:
+                response.raise_for_status()
+            except requests.HTTPError as error:
+                raise GeocoderError(str(error)) from error
+            return response.json()
+
+        self.circuit_breaker.record_failure()
+        raise GeocoderUnavailable(f'Геокодер не ответил после {self.max_retries + 1} попыток') from last_error
+
+    def geocode(self, address):
+        response = self.request({'geocode': address, 'apikey': self.apikey, 'format': 'json'})
+        places_found = response['response']['GeoObjectCollection']['featureMember']
+        if not places_found:
+            raise AddressNotFound(f'Адрес не найден: {address}')
+        most_relevant = places_found[0]
+        lon, lat = most_relevant['GeoObject']['Point']['pos'].split(' ')
+        return float(lon), float(lat)
+
+
+@lru_cache()
+def get_geocoder(apikey):
+    return YandexGeocoder(
+        apikey=apikey,
+        url=settings.GEOCODER_URL,
+        timeout=(settings.GEOCODER_CONNECT_TIMEOUT, settings.GEOCODER_READ_TIMEOUT),
+        max_retries=settings.GEOCODER_MAX_RETRIES,
+        backoff=settings.GEOCODER_RETRY_BACKOFF,
+        rate_limiter=TokenBucket(
+            'yandex_geocoder',
+            rate=settings.GEOCODER_RATE_LIMIT,
+            capacity=settings.GEOCODER_RATE_LIMIT_BURST,
+            using=settings.GEOCODER_RATE_LIMIT_DATABASE,
+        ),
+        circuit_breaker=CircuitBreaker(
+            failure_threshold=settings.GEOCODER_FAILURE_THRESHOLD,
+            recovery_timeout=settings.GEOCODER_RECOVERY_TIMEOUT,
+        ),
+        rate_limit_timeout=settings.GEOCODER_RATE_LIMIT_TIMEOUT,
+        pool_size=settings.GEOCODER_POOL_SIZE,
+    )
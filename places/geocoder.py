@@ -0,0 +1,373 @@
+import atexit
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict, namedtuple
+from concurrent.futures import Future
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from foodcartapp.tracking import FieldTrackerMixin
+from .client import AddressNotFound, GeocoderError, GeocoderThrottled, GeocoderUnavailable, get_geocoder
+from .models import Place, GeocodingTask
+from .signals import coordinates_fetched
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.items:
+                return None
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            if len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+class SingleFlight:
+    """Run concurrent calls with the same key only once and share the result."""
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, function):
+        with self.lock:
+            call = self.calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self.calls[key] = Future()
+        if not is_leader:
+            return call.result()
+
+        try:
+            result = function()
+        except Exception as error:
+            call.set_exception(error)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+
+class HitRateCounters:
+    """Geocode cache hit counters, kept in-process and periodically added to the shared cache."""
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self.pending = Counter()
+        self.flushed_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_cache_key(event):
+        return f'geocoder_stats:{event}'
+
+    def count(self, event):
+        with self.lock:
+            self.pending[event] += 1
+            flush_is_due = time.monotonic() - self.flushed_at >= self.flush_interval
+        if flush_is_due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.flushed_at = time.monotonic()
+        for event, value in pending.items():
+            cache_key = self.get_cache_key(event)
+            if not cache.add(cache_key, value, timeout=None):
+                cache.incr(cache_key, value)
+
+    def get_totals(self):
+        return {event: cache.get(self.get_cache_key(event), 0) for event in GEOCODER_STATS_EVENTS}
+
+    def reset(self):
+        with self.lock:
+            self.pending.clear()
+        cache.delete_many([self.get_cache_key(event) for event in GEOCODER_STATS_EVENTS])
+
+
+GEOCODER_STATS_EVENTS = ['lru_hits', 'db_hits', 'negative_hits', 'misses']
+
+KnownPlace = namedtuple('KnownPlace', ['coordinates', 'status', 'expires_at', 'error'])
+
+places_cache = LRUCache(settings.GEOCODER_LRU_SIZE)
+inflight_requests = SingleFlight()
+geocoder_stats = HitRateCounters(settings.GEOCODER_STATS_FLUSH_INTERVAL)
+atexit.register(geocoder_stats.flush)
+
+
+ADDRESS_ABBREVIATIONS = {
+    'г': 'город',
+    'гор': 'город',
+    'обл': 'область',
+    'р-н': 'район',
+    'мкр': 'микрорайон',
+    'мкрн': 'микрорайон',
+    'ул': 'улица',
+    'пр': 'проспект',
+    'пр-т': 'проспект',
+    'просп': 'проспект',
+    'пр-д': 'проезд',
+    'пер': 'переулок',
+    'пл': 'площадь',
+    'наб': 'набережная',
+    'ш': 'шоссе',
+    'б-р': 'бульвар',
+    'бул': 'бульвар',
+    'бульв': 'бульвар',
+    'д': 'дом',
+    'к': 'корпус',
+    'корп': 'корпус',
+    'стр': 'строение',
+    'кв': 'квартира',
+}
+ADDRESS_PUNCTUATION = re.compile(r'[.,;:!?"\'«»()\[\]]+')
+
+
+def normalize_address(address):
+    address = ADDRESS_PUNCTUATION.sub(' ', address.casefold().replace('ё', 'е'))
+    words = [ADDRESS_ABBREVIATIONS.get(word, word) for word in address.split()]
+    return ' '.join(
+        word for word, next_word in zip(words, words[1:] + [''])
+        if not (word == 'дом' and next_word[:1].isdigit())
+    )
+
+
+def request_coordinates(apikey, address):
+    return inflight_requests.do((apikey, address), lambda: get_geocoder(apikey).geocode(address))
+
+
+def remember_known_place(place):
+    known_place = KnownPlace(
+        coordinates=(place.lon, place.lat) if place.status == Place.Status.found else None,
+        status=place.status,
+        expires_at=place.get_expiration_time(),
+        error=place.last_error,
+    )
+    places_cache.set(place.address, known_place)
+    return known_place
+
+
+def get_known_place(address):
+    known_place = places_cache.get(address)
+    if known_place:
+        return known_place, True
+
+    place = Place.objects.filter(address=address).first()
+    if not place:
+        return None, False
+    return remember_known_place(place), False
+
+
+def prefetch_known_places(addresses):
+    unknown_addresses = [address for address in addresses if not places_cache.get(address)]
+    for place in Place.objects.filter(address__in=unknown_addresses):
+        remember_known_place(place)
+
+
+def find_known_coordinates(address):
+    address = normalize_address(address)
+    known_place, from_memory = get_known_place(address)
+    if not known_place:
+        return None
+
+    if known_place.coordinates:
+        geocoder_stats.count('lru_hits' if from_memory else 'db_hits')
+        return known_place.coordinates
+    if known_place.expires_at <= timezone.now():
+        return None
+
+    geocoder_stats.count('negative_hits')
+    if known_place.status == Place.Status.not_found:
+        raise AddressNotFound(f'Адрес не найден: {address}')
+    raise GeocoderUnavailable(f'Геокодер недавно не смог найти адрес {address}: {known_place.error}')
+
+
+def remember_coordinates(address, coordinates):
+    lon, lat = coordinates
+    Place.objects.update_or_create(address=address, defaults={
+        'lon': lon,
+        'lat': lat,
+        'fetched_at': timezone.now(),
+        'status': Place.Status.found,
+        'failures': 0,
+        'last_error': '',
+    })
+    places_cache.set(address, KnownPlace(coordinates, Place.Status.found, None, ''))
+
+
+def remember_failure(address, status, error):
+    fetched_at = timezone.now()
+    failed_places = Place.objects.filter(address=address)
+    updated = failed_places.update(
+        lon=None, lat=None, status=status, fetched_at=fetched_at,
+        failures=F('failures') + 1, last_error=str(error),
+    )
+    if not updated:
+        Place.objects.get_or_create(address=address, defaults={
+            'status': status,
+            'fetched_at': fetched_at,
+            'failures': 1,
+            'last_error': str(error),
+        })
+    place = failed_places.first()
+    places_cache.set(address, KnownPlace(None, status, place.get_expiration_time(), place.last_error))
+
+
+def fetch_coordinates(apikey, address):
+    coordinates = find_known_coordinates(address)
+    if coordinates:
+        return coordinates
+
+    geocoder_stats.count('misses')
+    address = normalize_address(address)
+    try:
+        coordinates = request_coordinates(apikey, address)
+    except GeocoderThrottled:
+        raise
+    except AddressNotFound as error:
+        remember_failure(address, Place.Status.not_found, error)
+        raise
+    except GeocoderError as error:
+        remember_failure(address, Place.Status.failed, error)
+        raise
+    remember_coordinates(address, coordinates)
+    return coordinates
+
+
+def locate_in_bulk(instances):
+    """Fill in coordinates of unsaved instances, return the ones left without them."""
+    prefetch_known_places({normalize_address(instance.address) for instance in instances})
+    deferred = settings.GEOCODING_MODE == 'deferred'
+    coordinates = {}
+    for address in {instance.address for instance in instances}:
+        try:
+            if deferred:
+                coordinates[address] = find_known_coordinates(address)
+            else:
+                coordinates[address] = fetch_coordinates(settings.YANDEX_KEY, address)
+        except GeocoderError:
+            coordinates[address] = None
+
+    unlocated_instances = []
+    for instance in instances:
+        instance.lon, instance.lat = coordinates[instance.address] or (None, None)
+        instance._geocoded_address = instance.address
+        if not coordinates[instance.address]:
+            unlocated_instances.append(instance)
+    return unlocated_instances
+
+
+def enqueue_geocoding(instances):
+    """Queue geocoding of the instances' addresses.
+
+    A task already queued for the same address is kept with its attempts and
+    schedule, only a task for an outdated address is replaced.
+    """
+    tasks = {
+        (ContentType.objects.get_for_model(instance), instance.pk): GeocodingTask(
+            content_type=ContentType.objects.get_for_model(instance),
+            object_id=instance.pk,
+            address=instance.address,
+        )
+        for instance in instances
+    }
+    objects_ids = defaultdict(list)
+    for content_type, object_id in tasks:
+        objects_ids[content_type].append(object_id)
+
+    with transaction.atomic():
+        stale_tasks_ids = []
+        for content_type, object_ids in objects_ids.items():
+            queued_tasks = GeocodingTask.objects.filter(content_type=content_type, object_id__in=object_ids)\
+                .values_list('id', 'object_id', 'address')
+            for task_id, object_id, address in queued_tasks:
+                if tasks[content_type, object_id].address == address:
+                    del tasks[content_type, object_id]
+                else:
+                    stale_tasks_ids.append(task_id)
+        GeocodingTask.objects.filter(id__in=stale_tasks_ids).delete()
+        GeocodingTask.objects.bulk_create(tasks.values(), ignore_conflicts=True)
+
+
+def process_geocoding_tasks(batch_size, max_attempts):
+    tasks = GeocodingTask.objects.filter(scheduled_at__lte=timezone.now(), attempts__lt=max_attempts)\
+        .select_related('content_type').order_by('scheduled_at')[:batch_size]
+    tasks = list(tasks)
+    for task in tasks:
+        try:
+            lon, lat = fetch_coordinates(settings.YANDEX_KEY, task.address)
+        except GeocoderError as error:
+            task.attempts += 1
+            task.scheduled_at = timezone.now() + timedelta(minutes=2 ** task.attempts)
+            task.last_error = repr(error)
+            task.save(update_fields=['attempts', 'scheduled_at', 'last_error'])
+            continue
+
+        model = task.content_type.model_class()
+        with transaction.atomic():
+            updated = model.objects.filter(pk=task.object_id, address=task.address)\
+                .update(lon=lon, lat=lat)
+            GeocodingTask.objects.filter(pk=task.pk, address=task.address).delete()
+        if updated:
+            coordinates_fetched.send(sender=model, object_ids=[task.object_id])
+    return len(tasks)
+
+
+class GeocodedMixin(FieldTrackerMixin):
+    tracked_fields = ['address']
+
+    def needs_geocoding(self, update_fields=None):
+        if update_fields is not None and 'address' not in update_fields:
+            return False
+        if getattr(self, '_geocoded_address', None) == self.address:
+            return False
+        return self.has_changed('address') or self.lon is None or self.lat is None
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if not self.needs_geocoding(update_fields):
+            return super().save(*args, **kwargs)
+
+        deferred = settings.GEOCODING_MODE == 'deferred'
+        try:
+            if deferred:
+                coordinates = find_known_coordinates(self.address)
+            else:
+                coordinates = fetch_coordinates(settings.YANDEX_KEY, self.address)
+        except GeocoderError:
+            coordinates = None
+
+        if coordinates or self.has_changed('address'):
+            self.lon, self.lat = coordinates or (None, None)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'lon', 'lat'}
+        self._geocoded_address = self.address
+        super().save(*args, **kwargs)
+        if deferred and not coordinates:
+            enqueue_geocoding([self])
@@ -0,0 +1,20 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from places.geocoder import GeocodedMixin, enqueue_geocoding
+
+
+class Command(BaseCommand):
+    help = 'Ставит в очередь геокодирования все заказы и рестораны без координат'
+
+    def handle(self, *args, **options):
+        for model in apps.get_models():
+            if not issubclass(model, GeocodedMixin):
+                continue
+            instances = list(
+                model.objects.filter(Q(lon__isnull=True) | Q(lat__isnull=True)).only('pk', 'address')
+            )
+            if instances:
+                enqueue_geocoding(instances)
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {len(instances)} без координат')
@@ -0,0 +1,141 @@
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from timeit import default_timer
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from places.client import AddressNotFound, GeocoderError, GeocoderThrottled
+from places.geocoder import GeocodedMixin, normalize_address, request_coordinates
+from places.models import Place
+from places.signals import coordinates_fetched
+
+
+def find_objects_without_coordinates():
+    for model in apps.get_models():
+        if issubclass(model, GeocodedMixin):
+            yield from model.objects.filter(Q(lon__isnull=True) | Q(lat__isnull=True)).only('pk', 'address')
+
+
+class Command(BaseCommand):
+    help = (
+        'Геокодирует адреса пачкой в несколько потоков. Адреса читаются из файлов или stdin ("-"), '
+        'без файлов — берутся у заказов и ресторанов без координат'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='Файлы с адресами, по одному на строку')
+        parser.add_argument('--workers', type=int, default=8, help='Число одновременных запросов к геокодеру')
+
+    def handle(self, *args, **options):
+        objects = []
+        if options['files']:
+            addresses = self.read_addresses(options['files'])
+        else:
+            objects = list(find_objects_without_coordinates())
+            addresses = [instance.address for instance in objects]
+
+        addresses = {normalize_address(address) for address in addresses if address.strip()}
+        known_places = {place.address: place for place in Place.objects.filter(address__in=addresses)}
+        coordinates = {
+            address: (place.lon, place.lat) for address, place in known_places.items()
+            if place.status == Place.Status.found
+        }
+        now = timezone.now()
+        recently_failed = {
+            address for address, place in known_places.items()
+            if place.status != Place.Status.found and place.get_expiration_time() > now
+        }
+        unknown_addresses = sorted(addresses - coordinates.keys() - recently_failed)
+        self.stdout.write(
+            f'Адресов: {len(addresses)}, уже известны: {len(coordinates)}, '
+            f'недавно не найдены: {len(recently_failed)}'
+        )
+
+        started_at = default_timer()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            results = dict(zip(unknown_addresses, executor.map(self.geocode, unknown_addresses)))
+        elapsed = default_timer() - started_at
+
+        fetched_coordinates = {
+            address: result for address, result in results.items() if isinstance(result, tuple)
+        }
+        failures = {
+            address: error for address, error in results.items()
+            if isinstance(error, GeocoderError) and not isinstance(error, GeocoderThrottled)
+        }
+        fetched_at = timezone.now()
+        Place.objects.filter(address__in=fetched_coordinates).delete()
+        Place.objects.bulk_create([
+            Place(address=address, lon=lon, lat=lat, fetched_at=fetched_at, status=Place.Status.found)
+            for address, (lon, lat) in fetched_coordinates.items()
+        ], ignore_conflicts=True)
+        self.remember_failures(failures, known_places, fetched_at)
+        coordinates.update(fetched_coordinates)
+
+        if objects:
+            self.update_objects(objects, coordinates)
+
+        throughput = len(unknown_addresses) / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Геокодировано: {len(fetched_coordinates)} из {len(unknown_addresses)} '
+            f'за {elapsed:.2f} с, {throughput:.1f} адресов/с'
+        )
+
+    def remember_failures(self, failures, known_places, fetched_at):
+        failed_places = []
+        new_places = []
+        for address, error in failures.items():
+            status = Place.Status.not_found if isinstance(error, AddressNotFound) else Place.Status.failed
+            place = known_places.get(address)
+            if not place:
+                new_places.append(Place(
+                    address=address, fetched_at=fetched_at, status=status, failures=1, last_error=str(error),
+                ))
+                continue
+            # Repeated failures of a known address extend its negative cache TTL
+            place.lon, place.lat = None, None
+            place.status = status
+            place.fetched_at = fetched_at
+            place.failures += 1
+            place.last_error = str(error)
+            failed_places.append(place)
+
+        Place.objects.bulk_update(
+            failed_places, ['lon', 'lat', 'status', 'fetched_at', 'failures', 'last_error'], batch_size=500,
+        )
+        Place.objects.bulk_create(new_places, ignore_conflicts=True)
+
+    def read_addresses(self, files):
+        for path in files:
+            if path == '-':
+                yield from sys.stdin
+                continue
+            with open(path, encoding='utf-8') as file:
+                yield from file
+
+    def geocode(self, address):
+        try:
+            return request_coordinates(settings.YANDEX_KEY, address)
+        except GeocoderError as error:
+            self.stderr.write(f'{address}: {error}')
+            return error
+
+    def update_objects(self, objects, coordinates):
+        located_objects = defaultdict(list)
+        for instance in objects:
+            instance_coordinates = coordinates.get(normalize_address(instance.address))
+            if instance_coordinates:
+                instance.lon, instance.lat = instance_coordinates
+                located_objects[type(instance)].append(instance)
+
+        with transaction.atomic():
+            for model, instances in located_objects.items():
+                model.objects.bulk_update(instances, ['lon', 'lat'], batch_size=500)
+        for model, instances in located_objects.items():
+            coordinates_fetched.send(sender=model, object_ids=[instance.pk for instance in instances])
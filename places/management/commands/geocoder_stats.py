@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from places.geocoder import geocoder_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает долю адресов, найденных в кэше геокодера без запроса к Яндексу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Обнулить счётчики')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            geocoder_stats.reset()
+            self.stdout.write('Счётчики обнулены')
+            return
+
+        totals = geocoder_stats.get_totals()
+        lookups = sum(totals.values())
+        hits = totals['lru_hits'] + totals['db_hits'] + totals['negative_hits']
+        self.stdout.write(
+            f"Запросов координат: {lookups}\n"
+            f"Из памяти процесса: {totals['lru_hits']}\n"
+            f"Из базы мест: {totals['db_hits']}\n"
+            f"Заведомо ненаходимых адресов: {totals['negative_hits']}\n"
+            f"Запросов к геокодеру: {totals['misses']}"
+        )
+        if lookups:
+            self.stdout.write(f'Доля попаданий в кэш: {hits / lookups:.1%}')
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from places.geocoder import process_geocoding_tasks
+
+
+class Command(BaseCommand):
+    help = 'Заполняет координаты заказов и ресторанов из очереди геокодирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument('--poll-interval', type=float, default=5, help='Пауза в секундах, когда очередь пуста')
+        parser.add_argument('--once', action='store_true', help='Разобрать очередь и завершиться')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_geocoding_tasks(options['batch_size'], options['max_attempts'])
+            if processed:
+                self.stdout.write(f'Обработано задач: {processed}')
+                continue
+            if options['once']:
+                return
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,30 @@
+# Generated by Django 3.0.7 on 2026-10-18 20:06
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Place',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(max_length=100, unique=True, verbose_name='нормализованный адрес')),
+                ('lon', models.FloatField(blank=True, null=True, verbose_name='Долгота')),
+                ('lat', models.FloatField(blank=True, null=True, verbose_name='Широта')),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата запроса к геокодеру')),
+                ('status', models.CharField(choices=[('found', 'Найден')], default='found', max_length=9, verbose_name='Статус геокодирования')),
+            ],
+            options={
+                'verbose_name': 'место',
+                'verbose_name_plural': 'места',
+            },
+        ),
+    ]
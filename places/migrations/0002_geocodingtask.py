@@ -0,0 +1,34 @@
+# Generated by Django 3.0.7 on 2026-10-18 20:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('places', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodingTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('address', models.CharField(max_length=100, verbose_name='адрес')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Поставлена в очередь')),
+                ('scheduled_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Следующая попытка')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Число попыток')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+            ],
+            options={
+                'verbose_name': 'задача геокодирования',
+                'verbose_name_plural': 'задачи геокодирования',
+                'unique_together': {('content_type', 'object_id')},
+            },
+        ),
+    ]
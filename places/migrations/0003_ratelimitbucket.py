@@ -0,0 +1,26 @@
+# Generated by Django 3.0.7 on 2026-10-18 20:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0002_geocodingtask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='название')),
+                ('tokens', models.FloatField(verbose_name='Доступно запросов')),
+                ('refilled_at', models.FloatField(verbose_name='Время пополнения, unix timestamp')),
+            ],
+            options={
+                'verbose_name': 'лимит запросов',
+                'verbose_name_plural': 'лимиты запросов',
+            },
+        ),
+    ]
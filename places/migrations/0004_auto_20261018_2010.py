@@ -0,0 +1,28 @@
+# Generated by Django 3.0.7 on 2026-10-18 20:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0003_ratelimitbucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='failures',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Неудачных запросов подряд'),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='last_error',
+            field=models.TextField(blank=True, verbose_name='Последняя ошибка'),
+        ),
+        migrations.AlterField(
+            model_name='place',
+            name='status',
+            field=models.CharField(choices=[('found', 'Найден'), ('not_found', 'Не найден'), ('failed', 'Ошибка геокодера')], default='found', max_length=9, verbose_name='Статус геокодирования'),
+        ),
+    ]
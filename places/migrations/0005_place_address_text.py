@@ -0,0 +1,18 @@
+# Generated by Django 3.0.7 on 2026-10-18 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0004_auto_20261018_2010'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='place',
+            name='address',
+            field=models.TextField(unique=True, verbose_name='нормализованный адрес'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class Place(models.Model):
+    class Status(models.TextChoices):
+        found = 'found', _('Найден')
+        not_found = 'not_found', _('Не найден')
+        failed = 'failed', _('Ошибка геокодера')
+
+    address = models.TextField('нормализованный адрес', unique=True)
+    lon = models.FloatField('Долгота', null=True, blank=True)
+    lat = models.FloatField('Широта', null=True, blank=True)
+    fetched_at = models.DateTimeField('Дата запроса к геокодеру', default=timezone.now)
+    status = models.CharField(
+        'Статус геокодирования', max_length=9,
+        choices=Status.choices, default=Status.found)
+    failures = models.PositiveSmallIntegerField('Неудачных запросов подряд', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    def __str__(self):
+        return self.address
+
+    def get_expiration_time(self):
+        if self.status == self.Status.found:
+            return None
+        if self.status == self.Status.not_found:
+            ttl = settings.GEOCODER_NOT_FOUND_TTL
+        else:
+            ttl = min(settings.GEOCODER_FAILURE_TTL * 2 ** max(self.failures - 1, 0),
+                      settings.GEOCODER_NOT_FOUND_TTL)
+        return self.fetched_at + timedelta(seconds=ttl)
+
+    class Meta:
+        verbose_name = 'место'
+        verbose_name_plural = 'места'
+
+
+class GeocodingTask(models.Model):
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    target = GenericForeignKey('content_type', 'object_id')
+    address = models.CharField('адрес', max_length=100)
+    created_at = models.DateTimeField('Поставлена в очередь', default=timezone.now)
+    scheduled_at = models.DateTimeField('Следующая попытка', default=timezone.now, db_index=True)
+    attempts = models.PositiveSmallIntegerField('Число попыток', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    def __str__(self):
+        return f'{self.content_type} #{self.object_id}: {self.address}'
+
+    class Meta:
+        verbose_name = 'задача геокодирования'
+        verbose_name_plural = 'задачи геокодирования'
+        unique_together = [
+            ['content_type', 'object_id']
+        ]
+
+
+class RateLimitBucket(models.Model):
+    name = models.CharField('название', max_length=50, unique=True)
+    tokens = models.FloatField('Доступно запросов')
+    refilled_at = models.FloatField('Время пополнения, unix timestamp')
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = 'лимит запросов'
+        verbose_name_plural = 'лимиты запросов'
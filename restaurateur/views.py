@@ -6,7 +6,7 @@ from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 from foodcartapp.models import Product, Restaurant, Order
-from geopy import distance
+from foodcartapp.spatial_index import find_nearest_restaurants_in_bulk
 
 
 class Login(forms.Form):
@@ -95,17 +95,20 @@ def view_restaurants(request):
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
-    orders = Order.objects.fetch_orders_with_total_and_restaurants()
-    print(orders[11].restaurants)
+    orders = Order.objects.open().fetch_orders_with_total_and_restaurants()
+    located_orders = {
+        order.id: (
+            order.lat, order.lon,
+            {restaurant.id: restaurant.name for restaurant in order.candidate_restaurants.all()},
+        )
+        for order in orders if order.lat and order.lon
+    }
+    nearest_restaurants = find_nearest_restaurants_in_bulk(located_orders)
     for order in orders:
-        if order.lat and order.lon:
-            order_coordinates = (order.lat, order.lon)
-            restaurants = [{name: round(distance.distance(order_coordinates, coordinates).km, 2)
-                            for name, coordinates in restaurant.items()}
-                           for restaurant in order.restaurants]
-            restaurants = sorted(restaurants, key=lambda d: sorted(d.values()))
-            order.restaurants = restaurants
-        print(order.restaurants)
+        if order.id in nearest_restaurants:
+            restaurants_names = located_orders[order.id][2]
+            order.restaurants = [{restaurants_names[restaurant_id]: round(restaurant_distance, 2)}
+                                 for restaurant_id, restaurant_distance in nearest_restaurants[order.id]]
     return render(request, template_name='order_items.html', context={
         'order_items': orders
     })